@@ -1,34 +1,603 @@
+"""Tool cache: bounded in-memory LRU with per-key TTL.
+
+Two layers share it. Raw upstream payloads ("raw:{url}?{params}", see
+utils.fetch_json_cached) carry the real TTLs, stale-while-revalidate and
+refresh-ahead, and are persisted to disk. Rendered tool output ("civ_stats:...",
+registered with @cache.loader) is a short-lived memo on top, so every
+presentation of one payload (filters, counts, top-N) costs one fetch.
+All loads are single-flight (one upstream call per key however many
+requests miss at once) and failed loads are negatively cached briefly.
+
+Entries are evicted least-recently-used once the cache exceeds its entry
+count or approximate byte budget; a background sweeper (started from the
+app lifespan) drops expired entries. Hit/miss/eviction counts are kept per
+key prefix (raw upstream keys per site and endpoint, see stats_group). Optionally backed by a shared SQLite store so several workers
+share results: get_or_load() reads it in a thread on a memory miss and
+writes go through its writer thread; get() and peek() only see memory.
+"""
+
+import asyncio
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import threading
 import time
-from typing import Any
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlsplit
+
+from config import (
+    CACHE_BACKEND, SHARED_CACHE_DB, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES,
+    CACHE_REFRESH_AHEAD, CACHE_REFRESH_MIN_HITS, CACHE_NEGATIVE_TTL, UPSTREAM_CACHE_DB,
+)
+
+# Per-task record of cache lookups, so callers (e.g. tool tracing) can tell
+# whether a tool was served from cache. Set to a dict to start recording.
+cache_activity: ContextVar[dict | None] = ContextVar("cache_activity", default=None)
+
+
+def _record(outcome: str):
+    activity = cache_activity.get()
+    if activity is not None:
+        activity[outcome] = activity.get(outcome, 0) + 1
+
+
+class SQLiteStore:
+    """Cross-process key/value store with per-key expiry, backed by one SQLite file.
+
+    All workers on a host open the same file (WAL mode), so an entry fetched
+    by one worker is a hit for every other worker. Values are pickled, and
+    zlib-compressed with compress=True (large upstream JSON payloads).
+
+    The methods are blocking (a busy file can hold them for the 5 s lock
+    timeout). From the event loop use aget(), which reads in a thread, and
+    the *_later() methods, which queue writes (pickling included) on the
+    store's single writer thread.
+    """
+
+    def __init__(self, path: str, compress: bool = False):
+        self.path = path
+        self.compress = compress
+        # One connection per thread (event loop, readers, writer), reopened after fork()
+        self._local = threading.local()
+        self._writer: ThreadPoolExecutor | None = None
+        self._writer_pid: int | None = None
+
+    def _get_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL,
+                    value BLOB NOT NULL
+                )
+            """)
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    async def aget(self, key: str) -> tuple[float, Any] | None:
+        """get() in a worker thread, so a locked file doesn't stall the event loop."""
+        return await asyncio.to_thread(self.get, key)
+
+    def _later(self, method: Callable, *args):
+        """Queue a write on the writer thread and return immediately; writes keep their order."""
+        # Like connections, the writer thread doesn't survive fork(): one per process
+        if self._writer is None or self._writer_pid != os.getpid():
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+            self._writer_pid = os.getpid()
+        self._writer.submit(method, *args)
+
+    def close(self):
+        """Wait for queued writes, then close this thread's connection."""
+        if self._writer is not None and self._writer_pid == os.getpid():
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def set_later(self, key: str, value: Any, expires_at: float):
+        self._later(self.set, key, value, expires_at)
+
+    def delete_later(self, key: str):
+        self._later(self.delete, key)
+
+    def cleanup_later(self):
+        self._later(self.cleanup)
+
+    def get(self, key: str) -> tuple[float, Any] | None:
+        """Return (expires_at, value) for an unexpired key, else None."""
+        try:
+            row = self._get_conn().execute(
+                "SELECT expires_at, value FROM cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return row[0], self._decode(row[1])
+
+    def set(self, key: str, value: Any, expires_at: float):
+        try:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, expires_at, self._encode(value)),
+            )
+            conn.commit()
+        except (sqlite3.Error, pickle.PicklingError):
+            pass
+
+    def items(self) -> list[tuple[str, float, Any]]:
+        """All unexpired (key, expires_at, value) rows, e.g. to warm a memory cache."""
+        try:
+            rows = self._get_conn().execute(
+                "SELECT key, expires_at, value FROM cache WHERE expires_at > ?", (time.time(),)
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+        return [(key, expires_at, self._decode(value)) for key, expires_at, value in rows]
+
+    def _encode(self, value: Any) -> bytes:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        return zlib.compress(data) if self.compress else data
+
+    def _decode(self, data: bytes) -> Any:
+        return pickle.loads(zlib.decompress(data) if self.compress else data)
+
+    def delete(self, key: str):
+        try:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def cleanup(self):
+        try:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+
+def approx_size(value: Any) -> int:
+    """Rough in-memory size of a cached value in bytes (strings dominate)."""
+    if isinstance(value, (str, bytes)):
+        return len(value) + 50
+    if isinstance(value, (tuple, list, set)):
+        return 56 + sum(approx_size(v) for v in value)
+    if isinstance(value, dict):
+        return 64 + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if hasattr(value, "__dict__"):  # pydantic models (Source)
+        return 64 + approx_size(vars(value))
+    return sys.getsizeof(value)
+
+
+def key_prefix(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+def _fresh_exception(exc: Exception) -> Exception:
+    """A traceback-free copy of a cached failure, so repeated raises don't pile
+    frames onto one shared instance (falls back to stripping it in place)."""
+    try:
+        return copy.copy(exc).with_traceback(None)
+    except Exception:
+        return exc.with_traceback(None)
+
+
+def stats_group(key: str) -> str:
+    """Group a key is counted under: its prefix, or for raw upstream keys the
+    site plus first path segment ("raw:aoe4world/stats", "raw:aoe4guides/builds"),
+    so hit ratios and memory are per endpoint rather than one "raw" bucket.
+    """
+    prefix = key_prefix(key)
+    if prefix != "raw":
+        return prefix
+    parsed = urlsplit(key[len("raw:"):])
+    host = (parsed.hostname or "").removeprefix("www.").rsplit(".", 1)[0]
+    segments = [s for s in parsed.path.split("/") if s and s != "api" and not re.fullmatch(r"v\d+", s)]
+    return f"raw:{host}/{segments[0]}" if segments else f"raw:{host}"
+
+
+def cache_key(tool: str, args: dict) -> str:
+    """Stable key "{tool}:{hash}" for a tool call's arguments.
+
+    Arguments are expected already canonical (tools.normalize); None and empty
+    values are dropped, strings are casefolded with whitespace collapsed and
+    keys are sorted, so argument order, letter case and omitted optionals
+    don't change the key (the tool itself still gets the user's spelling).
+    Hashing keeps keys short however long the free-text arguments are.
+    """
+    canonical = {
+        name: " ".join(value.split()).casefold() if isinstance(value, str) else value
+        for name, value in args.items()
+        if value is not None and value != ""
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return f"{tool}:{hashlib.sha256(encoded.encode()).hexdigest()[:16]}"
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "MISS"
+
+
+# Returned by TTLCache.get() when there is no fresh value. Compare with `is`:
+# None, "", [] and ("No players found", []) are all legitimate cached values.
+MISS = _Missing()
+
+
+class CacheEntry:
+    """A cached value with its metadata (stored_at is epoch seconds, TTLs in seconds)."""
+
+    __slots__ = ("value", "stored_at", "ttl", "stale_ttl", "size", "hits")
+
+    def __init__(self, value: Any, stored_at: float, ttl: float, stale_ttl: float = 0):
+        self.value = value
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.size = approx_size(value)
+        self.hits = 0
+
+    @property
+    def expires_at(self) -> float:
+        return self.stored_at + self.ttl
+
+    @property
+    def stale_until(self) -> float:
+        return self.expires_at + self.stale_ttl
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
 
 
 class TTLCache:
-    """Simple in-memory cache with per-key TTL."""
+    """Size-bounded LRU cache with per-key TTL, optionally backed by a shared cross-process store.
+
+    Keys served through a registered loader (see loader()) are also kept for
+    a stale window past their TTL: an expired-but-recent value is returned
+    immediately while one background task reloads it, and hot keys are
+    reloaded shortly before they expire.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        max_bytes: int = 64 * 1024 * 1024,
+        shared: SQLiteStore | None = None,
+        refresh_ahead: float = 0.1,
+        refresh_min_hits: int = 2,
+        negative_ttl: int = 30,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.refresh_ahead = refresh_ahead
+        self.refresh_min_hits = refresh_min_hits
+        self.negative_ttl = negative_ttl
+        # Order = recency (last = most recently used)
+        self._store: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        # key prefix -> {"hits", "misses", "stale", "refreshes", "coalesced", "failures", ...}
+        self._stats: dict[str, dict[str, int]] = {}
+        # prefix -> loader function registered with loader()
+        self.loaders: dict[str, Callable] = {}
+        # key -> running loader call (misses and background refreshes share it)
+        self._inflight: dict[str, asyncio.Task] = {}
+        # key -> (retry after, exception) for loads that failed recently
+        self._failures: dict[str, tuple[float, Exception]] = {}
+        # key -> tool call arguments behind a hashed loader key, for stats reports
+        self._labels: dict[str, dict] = {}
+
+    def _count(self, key: str, stat: str):
+        group = stats_group(key)
+        stats = self._stats.get(group)
+        if stats is None:
+            stats = self._stats[group] = dict.fromkeys(
+                ("hits", "misses", "stale", "refreshes", "coalesced", "failures", "negative_hits",
+                 "evictions", "expired"), 0
+            )
+        stats[stat] += 1
 
-    def __init__(self):
-        self._store: dict[str, tuple[float, Any]] = {}
+    def _remove(self, key: str):
+        self._bytes -= self._store.pop(key).size
+        self._labels.pop(key, None)
 
-    def get(self, key: str) -> Any | None:
+    def _insert(self, key: str, entry: CacheEntry):
+        previous = self._store.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._store[key] = entry
+        self._bytes += entry.size
+        while self._store and (len(self._store) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._store))
+            self._remove(oldest)
+            self._count(oldest, "evictions")
+
+    def _lookup(self, key: str) -> CacheEntry | None:
+        """Entry in memory that is fresh or still inside its stale window, else None."""
         entry = self._store.get(key)
-        if entry is None:
-            return None
-        expires_at, value = entry
-        if time.time() > expires_at:
-            del self._store[key]
+        if entry is not None and time.time() > entry.stale_until:
+            self._remove(key)
+            self._count(key, "expired")
+            entry = None
+        if entry is not None:
+            self._store.move_to_end(key)
+        return entry
+
+    async def _lookup_shared(self, key: str) -> CacheEntry | None:
+        """Memory miss: another worker may have fetched the key already (read in a thread)."""
+        shared_entry = await self.shared.aget(key)
+        if shared_entry is None:
+            return self._lookup(key)  # loaded in memory meanwhile, or still a miss
+        # The shared store only keeps the expiry: count the entry as stored now
+        expires_at, value = shared_entry
+        now = time.time()
+        entry = CacheEntry(value, now, expires_at - now)
+        self._insert(key, entry)  # bounded like any insert
+        return entry
+
+    def get_entry(self, key: str) -> CacheEntry | None:
+        """The fresh entry for key with its metadata, or None on a miss."""
+        entry = self._lookup(key)
+        if entry is None or time.time() > entry.expires_at:
+            self._count(key, "misses")
+            _record("misses")
             return None
-        return value
+        entry.hits += 1
+        self._count(key, "hits")
+        _record("hits")
+        return entry
+
+    def get(self, key: str, default: Any = MISS) -> Any:
+        """The fresh value for key, or default (MISS) when there is none."""
+        entry = self.get_entry(key)
+        return default if entry is None else entry.value
 
-    def set(self, key: str, value: Any, ttl: int):
-        self._store[key] = (time.time() + ttl, value)
+    def peek(self, key: str) -> CacheEntry | None:
+        """The fresh entry for key without counting a hit or miss."""
+        entry = self._lookup(key)
+        return entry if entry is not None and time.time() <= entry.expires_at else None
+
+    def set(self, key: str, value: Any, ttl: int, stale_ttl: int = 0):
+        self.set_entry(key, CacheEntry(value, time.time(), ttl, stale_ttl))
+
+    def set_entry(self, key: str, entry: CacheEntry, write_through: bool = True):
+        """Store an entry as is; write_through=False keeps it out of the shared store."""
+        self._insert(key, entry)
+        if write_through and self.shared is not None:
+            self.shared.set_later(key, entry.value, entry.expires_at)
 
     def invalidate(self, key: str):
-        self._store.pop(key, None)
+        if key in self._store:
+            self._remove(key)
+        if self.shared is not None:
+            self.shared.delete_later(key)
 
-    def cleanup(self):
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable], ttl: int, stale_ttl: int = 0,
+    ) -> Any:
+        """Return the cached value for key, calling loader() only on a miss.
+
+        Single-flight: concurrent misses on one key share a single loader
+        call. A loader exception is re-raised to every waiter and remembered
+        for negative_ttl seconds, so a failing upstream is not hammered by
+        each new request. With stale_ttl, an expired value is still served
+        for that long while one background load refreshes it. A loader may
+        return a CacheEntry to store a value with its own age (e.g. read
+        back from disk) instead of a fresh ttl.
+        """
+        entry = self._lookup(key)
+        if entry is None and self.shared is not None:
+            entry = await self._lookup_shared(key)
+        now = time.time()
+        if entry is not None and now <= entry.expires_at:
+            entry.hits += 1
+            self._count(key, "hits")
+            _record("hits")
+            if entry.hits >= self.refresh_min_hits and entry.expires_at - now < entry.ttl * self.refresh_ahead:
+                self._refresh(key, loader, ttl, stale_ttl)
+            return entry.value
+        if entry is not None:
+            self._count(key, "stale")
+            _record("hits")
+            self._refresh(key, loader, ttl, stale_ttl)
+            return entry.value
+
+        self._count(key, "misses")
+        _record("misses")
+        failure = self._failures.get(key)
+        if failure is not None and now < failure[0]:
+            self._count(key, "negative_hits")
+            raise _fresh_exception(failure[1])
+        if key in self._inflight:
+            self._count(key, "coalesced")
+        # Shielded: a waiter being cancelled (client gone) must not cancel the load for the others
+        return await asyncio.shield(self._start_load(key, loader, ttl, stale_ttl))
+
+    def _start_load(self, key: str, loader: Callable[[], Awaitable], ttl: int, stale_ttl: int) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader, ttl, stale_ttl))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._load_done(key, t))
+        return task
+
+    def _load_done(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here so background refresh failures don't warn
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable], ttl: int, stale_ttl: int) -> Any:
+        try:
+            value = await loader()
+        except Exception as e:
+            self._failures[key] = (time.time() + self.negative_ttl, e)
+            self._count(key, "failures")
+            print(f"[cache] Load of {key} failed: {e}")
+            raise
+        self._failures.pop(key, None)
+        # Empty and not-found results are cached like any other value
+        entry = value if isinstance(value, CacheEntry) else CacheEntry(value, time.time(), ttl, stale_ttl)
+        self.set_entry(key, entry)
+        return entry.value
+
+    async def reload(self, key: str, loader: Callable[[], Awaitable], ttl: int, stale_ttl: int = 0) -> Any:
+        """Run loader now and store the result even if key is still fresh (cache warming)."""
+        self._count(key, "refreshes")
+        return await asyncio.shield(self._start_load(key, loader, ttl, stale_ttl))
+
+    def _refresh(self, key: str, loader: Callable[[], Awaitable], ttl: int, stale_ttl: int):
+        """Reload key in the background unless a load is running or it recently failed."""
+        failure = self._failures.get(key)
+        if key in self._inflight or (failure is not None and time.time() < failure[0]):
+            return
+        self._count(key, "refreshes")
+        self._start_load(key, loader, ttl, stale_ttl)
+
+    def loader(self, prefix: str, ttl: int, stale_ttl: int = 0):
+        """Register an async tool function as the loader for keys cache_key(prefix, args).
+
+        Calls to the decorated function are served from the cache; the
+        function itself only runs on a miss or as a background refresh.
+        stale_ttl is how long an expired value may still be served while it
+        reloads. Exceptions propagate and are only remembered for the short
+        negative TTL (see get_or_load()).
+        """
+
+        def decorate(fn):
+            signature = inspect.signature(fn)
+            self.loaders[prefix] = fn
+
+            @functools.wraps(fn)
+            async def cached(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                # Arguments equal to their default are the same call as omitting them
+                params = {
+                    name: value for name, value in bound.arguments.items()
+                    if value != signature.parameters[name].default
+                }
+                key = cache_key(prefix, params)
+                self._labels[key] = params
+                return await self.get_or_load(key, lambda: fn(*args, **kwargs), ttl, stale_ttl)
+
+            return cached
+
+        return decorate
+
+    def cleanup(self) -> int:
+        """Drop entries past their stale window. Returns how many were removed from memory."""
         now = time.time()
-        expired = [k for k, (exp, _) in self._store.items() if now > exp]
+        expired = [k for k, entry in self._store.items() if now > entry.stale_until]
         for k in expired:
-            del self._store[k]
+            self._remove(k)
+            self._count(k, "expired")
+        for k in [k for k, (until, _) in self._failures.items() if now >= until]:
+            del self._failures[k]
+        for k in [k for k in self._labels if k not in self._store and k not in self._inflight]:
+            del self._labels[k]
+        if self.shared is not None:
+            self.shared.cleanup_later()
+        return len(expired)
+
+    async def run_sweeper(self, interval: float = 60):
+        """Periodically drop expired entries; run as a background task."""
+        while True:
+            await asyncio.sleep(interval)
+            removed = self.cleanup()
+            if removed:
+                print(f"[cache] Swept {removed} expired entries ({len(self)} left, ~{self._bytes // 1024} KB)")
+
+    def stats(self) -> dict:
+        """Size, per-prefix key cardinality and hit/miss/stale/eviction counters."""
+        keys: dict[str, int] = {}
+        for key in self._store:
+            prefix = stats_group(key)
+            keys[prefix] = keys.get(prefix, 0) + 1
+        by_prefix = {prefix: dict(counts) for prefix, counts in self._stats.items()}
+        for prefix, count in keys.items():
+            by_prefix.setdefault(prefix, {})["keys"] = count
+        return {
+            "entries": len(self._store),
+            "approx_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "loading": len(self._inflight),
+            "failing": len(self._failures),
+            "loaders": sorted(self.loaders),
+            "by_prefix": dict(sorted(by_prefix.items())),
+        }
+
+    def entry_info(self) -> list[tuple[str, int, int, float, dict | None]]:
+        """(key, approx bytes, hits, expires_at, arguments) per entry, for cache_stats."""
+        return [
+            (key, entry.size, entry.hits, entry.expires_at, self._labels.get(key))
+            for key, entry in self._store.items()
+        ]
+
+    def lookup_counts(self) -> dict[str, dict[str, int]]:
+        """Hits (stale serves included) and misses per stats_group(), for cache_stats."""
+        return {
+            prefix: {"hits": counts["hits"] + counts["stale"], "misses": counts["misses"]}
+            for prefix, counts in self._stats.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+
+cache = TTLCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+    shared=SQLiteStore(SHARED_CACHE_DB) if CACHE_BACKEND == "sqlite" else None,
+    refresh_ahead=CACHE_REFRESH_AHEAD,
+    refresh_min_hits=CACHE_REFRESH_MIN_HITS,
+    negative_ttl=CACHE_NEGATIVE_TTL,
+)
+
+# L2 for raw upstream JSON (see utils.fetch_json_cached): survives restarts
+upstream_store = SQLiteStore(UPSTREAM_CACHE_DB, compress=True) if UPSTREAM_CACHE_DB else None
+
 
+def preload_upstream() -> int:
+    """Copy unexpired upstream payloads from disk into the memory cache. Returns the count.
 
-cache = TTLCache()
+    Blocking bulk read: only call it at startup, before requests are served.
+    Rows are the CacheEntry the payload was first cached with, so they keep
+    their age, TTL and stale window; they are not copied to the shared store
+    (other workers preload the same file).
+    """
+    if upstream_store is None:
+        return 0
+    upstream_store.cleanup()
+    loaded = 0
+    for key, _, entry in upstream_store.items():
+        if isinstance(entry, CacheEntry):  # rows from older versions held the bare payload
+            cache.set_entry(key, entry, write_through=False)
+            loaded += 1
+    return loaded
@@ -0,0 +1,122 @@
+"""Per-prefix contents of every in-process cache, for /api/cache/stats and /api/metrics.
+
+Each cache exposes entry_info() — (key, approx bytes, hits, expires_at,
+arguments) per entry — and lookup_counts() — hits and misses per key prefix.
+Here they are grouped by key prefix (civ_stats, builds, ...; raw upstream
+payloads per site and endpoint, e.g. raw:aoe4world/stats) into entry
+count, memory, hit ratio, average value size, hottest keys and how soon the
+entries expire, which is what TTL tuning in config.py needs. Figures are per
+worker.
+"""
+
+import re
+import time
+from urllib.parse import parse_qsl, urlencode
+
+import metrics
+from cache import cache, key_prefix, stats_group
+from chat import conversation_memo, guide_cache
+from config import CACHE_STATS_TOP_KEYS, CACHE_STATS_EXPIRY_BUCKETS, CACHE_STATS_SHOW_ARGS
+
+CACHES = {
+    "tool_cache": cache,                     # raw upstream payloads + rendered tool output
+    "guide_cache": guide_cache,              # full civ guide answers (prefix: prompt assets hash)
+    "conversation_memo": conversation_memo,  # tool results per conversation (prefix: tool name)
+}
+
+
+# Raw upstream query params whose values are filters, not user input
+_SAFE_PARAMS = {
+    "civ", "civilization", "map", "patch", "mode", "leaderboard", "rank_level", "country", "page", "limit",
+    "include_civs", "orderBy",
+}
+
+
+def _redact(key: str) -> str:
+    """Raw upstream key without user input: player ids and free-text params masked."""
+    if key_prefix(key) != "raw":
+        return key  # tool and memo keys are hashed, guide keys are civ + language
+    url, _, query = key.partition("?")
+    url = re.sub(r"/\d+(?=/|$)", "/{id}", url)
+    params = [(name, value if name in _SAFE_PARAMS else "*") for name, value in parse_qsl(query)]
+    return f"{url}?{urlencode(params, safe='*')}" if params else url
+
+
+def _expiry_bucket(remaining: float) -> str:
+    for limit, label in CACHE_STATS_EXPIRY_BUCKETS:
+        if remaining < limit:
+            return label
+    return ">=1d"
+
+
+def summarize(
+    entries: list[tuple], lookups: dict[str, dict[str, int]], top: int = CACHE_STATS_TOP_KEYS,
+    show_args: bool = CACHE_STATS_SHOW_ARGS,
+) -> dict:
+    """Group entry_info() rows and lookup_counts() of one cache by stats_group().
+
+    Tool arguments behind hashed keys are user input (player names, queries),
+    so top_keys only carries them, and unmasked raw upstream keys, with show_args.
+    """
+    now = time.time()
+    groups: dict[str, list[tuple]] = {}
+    for row in entries:
+        groups.setdefault(stats_group(row[0]), []).append(row)
+
+    report = {}
+    for prefix in sorted(set(groups) | set(lookups)):
+        rows = groups.get(prefix, [])
+        counts = lookups.get(prefix, {"hits": 0, "misses": 0})
+        total_bytes = sum(size for _, size, _, _, _ in rows)
+        lookups_total = counts["hits"] + counts["misses"]
+        expiry = dict.fromkeys([label for _, label in CACHE_STATS_EXPIRY_BUCKETS] + [">=1d"], 0)
+        for _, _, _, expires_at, _ in rows:
+            expiry[_expiry_bucket(expires_at - now)] += 1
+        hottest = sorted((row for row in rows if row[2] > 0), key=lambda row: row[2], reverse=True)[:top]
+        report[prefix] = {
+            "entries": len(rows),
+            "approx_bytes": total_bytes,
+            "avg_value_bytes": total_bytes // len(rows) if rows else 0,
+            "hits": counts["hits"],
+            "misses": counts["misses"],
+            "hit_ratio": round(counts["hits"] / lookups_total, 3) if lookups_total else None,
+            "top_keys": [
+                {
+                    "key": key if show_args else _redact(key),
+                    **({"args": args} if show_args else {}),
+                    "hits": hits,
+                    "expires_in_s": int(expires_at - now),
+                }
+                for key, _, hits, expires_at, args in hottest
+            ],
+            "expiry": expiry,
+        }
+    return report
+
+
+def report(top: int = CACHE_STATS_TOP_KEYS) -> dict:
+    """Totals and the per-prefix summary of every cache."""
+    result = {}
+    for name, source in CACHES.items():
+        by_prefix = summarize(source.entry_info(), source.lookup_counts(), top)
+        result[name] = {
+            "entries": sum(group["entries"] for group in by_prefix.values()),
+            "approx_bytes": sum(group["approx_bytes"] for group in by_prefix.values()),
+            "by_prefix": by_prefix,
+        }
+    return result
+
+
+def update_metrics():
+    """Refresh the cache gauges from the current cache contents (called before each scrape)."""
+    gauges = (metrics.CACHE_ENTRIES, metrics.CACHE_BYTES, metrics.CACHE_HIT_RATIO, metrics.CACHE_EXPIRING)
+    for gauge in gauges:
+        gauge.clear()  # prefixes that left the cache must not keep their last value
+    for name, summary in report(top=0).items():
+        for prefix, group in summary["by_prefix"].items():
+            metrics.CACHE_ENTRIES.set(group["entries"], cache=name, prefix=prefix)
+            metrics.CACHE_BYTES.set(group["approx_bytes"], cache=name, prefix=prefix)
+            if group["hit_ratio"] is not None:
+                metrics.CACHE_HIT_RATIO.set(group["hit_ratio"], cache=name, prefix=prefix)
+            for bucket, count in group["expiry"].items():
+                metrics.CACHE_EXPIRING.set(count, cache=name, prefix=prefix, within=bucket)
@@ -0,0 +1,147 @@
+"""Background warming of the hottest upstream payloads.
+
+Most traffic lands on a handful of aoe4world/aoe4guides requests: civ stats,
+matchups and maps for ranked 1v1, leaderboard page 1 and the build orders of
+every civ. The warmer refetches each of them before it expires so users never
+pay for a cold fetch. Requests are spaced per host (with jitter) and the
+cycle and its first pass are jittered too. Only one process per host warms
+(it holds a file lock next to the disk tier, CACHE_WARM_LOCK); the other
+workers read its payloads from the disk tier on their next miss, and take
+over the lock if that process exits.
+
+Targets must match the requests the tools make (same URL and params), or the
+tools will miss the warmed keys; coverage() reports which keys are warm.
+"""
+
+import asyncio
+import random
+import time
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every process warms
+    fcntl = None
+
+from cache import cache
+from config import (
+    AOE4WORLD_BASE, AOE4GUIDES_BASE, GUIDES_CIV_MAP, CACHE_TTL_STATS, CACHE_TTL_BUILDS,
+    CACHE_WARM_INTERVAL, CACHE_WARM_MODES, CACHE_WARM_HOST_SPACING, CACHE_WARM_JITTER,
+    CACHE_WARM_START_DELAY, CACHE_WARM_LOCK,
+)
+from utils import SourceUnavailable, UpstreamError, upstream_key, warm_json
+
+# Summary of the last completed cycle, for /api/health
+last_run: dict = {}
+# Open lock file while this process is the host's warmer (released when the process exits)
+_lock_file = None
+
+
+def _acquire_lock(path: str) -> bool:
+    """Try (without blocking) to become the warmer for this host."""
+    global _lock_file
+    if _lock_file is not None or fcntl is None or not path:
+        return True
+    lock_file = open(path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _lock_file = lock_file
+    return True
+
+
+def warm_targets(modes: list[str]) -> list[tuple[str, dict, int]]:
+    """(url, params, ttl) for every payload to keep warm."""
+    targets = []
+    for mode in modes:
+        targets += [
+            (f"{AOE4WORLD_BASE}/stats/{mode}/civilizations", {}, CACHE_TTL_STATS),  # get_civ_stats, get_patch_notes
+            (f"{AOE4WORLD_BASE}/stats/{mode}/matchups", {}, CACHE_TTL_STATS),       # get_matchup_stats
+            (f"{AOE4WORLD_BASE}/stats/{mode}/maps", {"include_civs": "true"}, CACHE_TTL_STATS),  # get_map_stats
+            (f"{AOE4WORLD_BASE}/leaderboards/{mode}", {"page": 1}, CACHE_TTL_STATS),  # get_leaderboard
+        ]
+    for guides_code in sorted(set(GUIDES_CIV_MAP.values())):  # search_build_orders
+        targets.append((
+            f"{AOE4GUIDES_BASE}/api/builds", {"civ": guides_code, "orderBy": "scoreAllTime"}, CACHE_TTL_BUILDS,
+        ))
+    return targets
+
+
+def coverage(targets: list[tuple[str, dict, int]]) -> dict:
+    """How many targets are fresh in the cache right now."""
+    warm = sum(1 for url, params, _ in targets if cache.peek(upstream_key(url, params)) is not None)
+    return {"targets": len(targets), "warm": warm, "coverage": round(warm / len(targets), 3) if targets else 1.0}
+
+
+async def warm_once(
+    targets: list[tuple[str, dict, int]], horizon: float, spacing: float, jitter: float,
+) -> dict:
+    """One pass: refetch every target expiring within `horizon` seconds, hosts in parallel."""
+    by_host: dict[str, list] = {}
+    for target in targets:
+        by_host.setdefault(urlparse(target[0]).netloc, []).append(target)
+    counts = {"fetched": 0, "failed": 0}
+
+    async def warm_host(host: str, host_targets: list):
+        for url, params, ttl in host_targets:
+            try:
+                if not await warm_json(url, params, ttl, horizon):
+                    continue
+                counts["fetched"] += 1
+            except SourceUnavailable:
+                # Circuit open: skip the rest of this host until the next cycle
+                counts["failed"] += 1
+                print(f"[warmup] {host} unavailable, skipping until next cycle")
+                return
+            except UpstreamError as e:
+                counts["failed"] += 1
+                print(f"[warmup] {e}")
+            await asyncio.sleep(spacing * (1 + random.uniform(0, jitter)))
+
+    start = time.monotonic()
+    await asyncio.gather(*(warm_host(host, items) for host, items in by_host.items()))
+    return {
+        **counts,
+        **coverage(targets),
+        "duration_s": round(time.monotonic() - start, 1),
+        "finished_at": int(time.time()),
+    }
+
+
+async def run_warmer(
+    interval: float = CACHE_WARM_INTERVAL,
+    modes: list[str] = CACHE_WARM_MODES,
+    spacing: float = CACHE_WARM_HOST_SPACING,
+    jitter: float = CACHE_WARM_JITTER,
+    start_delay: float = CACHE_WARM_START_DELAY,
+    lock_path: str = CACHE_WARM_LOCK,
+):
+    """Warm forever: one pass shortly after startup, then every interval (+-jitter).
+
+    A process that doesn't hold the host's warmer lock only retries the lock
+    each interval.
+    """
+    global last_run
+    targets = warm_targets(modes)
+    # Anything that would expire before the next pass (worst case: longest jittered interval) is refetched now
+    horizon = interval * (1 + jitter) * 1.5
+    await asyncio.sleep(random.uniform(0, start_delay))
+    while True:
+        if _acquire_lock(lock_path):
+            last_run = await warm_once(targets, horizon, spacing, jitter)
+            print(
+                f"[warmup] {last_run['warm']}/{last_run['targets']} payloads warm "
+                f"(fetched {last_run['fetched']}, failed {last_run['failed']}) in {last_run['duration_s']}s"
+            )
+        await asyncio.sleep(interval * random.uniform(1 - jitter, 1 + jitter))
+
+
+def status() -> dict:
+    """Live coverage, whether this process is the host's warmer, and its last pass summary."""
+    return {
+        "live": coverage(warm_targets(CACHE_WARM_MODES)),
+        "warming": _lock_file is not None or fcntl is None or not CACHE_WARM_LOCK,
+        "last_run": last_run,
+    }
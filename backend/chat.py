@@ -1,25 +1,57 @@
 """Core chat orchestration: OpenAI streaming + tool call loop."""
 
+import asyncio
 import json
 import time
+from contextlib import aclosing
 from typing import AsyncGenerator
 
 from openai import AsyncOpenAI
 
-from config import OPENAI_API_KEY, OPENAI_MODEL, MAX_TOOL_CALLS_PER_TURN
-from models import ChatRequest, Source
+from config import (
+    OPENAI_API_KEY, OPENAI_MODEL, OPENAI_PLANNER_MODEL, MAX_TOOL_CALLS_PER_TURN, CIVILIZATIONS, CIV_DISPLAY_NAMES,
+    RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_DB, RESPONSE_REPLAY_CHUNK_CHARS,
+    CONVERSATION_MEMO_TTL, CONVERSATION_MEMO_MAX, CONVERSATION_MEMO_MAX_ENTRIES,
+    CONVERSATION_MEMO_CONTEXT_RESULTS, CONVERSATION_MEMO_CONTEXT_CHARS, CONVERSATION_MEMO_TOOL_TTLS,
+    FAST_PATH_ENABLED, FAST_PATH_CAPTION, FAST_PATH_CAPTION_MAX_TOKENS,
+)
+from models import ChatRequest, ChatMessage, Source
+from response_cache import ResponseCache
+from openai_payload import PromptAssets, stream_completion
+from conversation_memo import ConversationMemo
+from cache import cache_activity
+from tracing import Trace
 from tools import TOOL_REGISTRY
 from tools.definitions import TOOL_DEFINITIONS
+from tools.normalize import normalize_args
 from tools.knowledge_base import _detect_civ
 from data.glossary import expand_query
+from intent_router import route, route_direct
 
 client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 # ---------------------------------------------------------------------------
-# In-memory cache for civ guide responses (avoids re-calling LLM for same civ)
+# Response cache for civ guide answers (avoids re-calling LLM for same civ)
 # ---------------------------------------------------------------------------
-_guide_cache: dict[str, tuple[float, list[dict]]] = {}
-GUIDE_CACHE_TTL = 3600  # 1 hour
+guide_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=RESPONSE_CACHE_TTL,
+    db_path=RESPONSE_CACHE_DB,
+)
+
+# Tool results per conversation, so follow-ups don't refetch the same data
+conversation_memo = ConversationMemo(
+    max_conversations=CONVERSATION_MEMO_MAX,
+    max_entries=CONVERSATION_MEMO_MAX_ENTRIES,
+    ttl=CONVERSATION_MEMO_TTL,
+)
+
+# Prompts used to pre-warm the guide cache; they must map to the same
+# cache key as real user questions ('{civ}:{lang}').
+PREWARM_PROMPTS = {
+    "en": "How to play {civ}?",
+    "es": "¿Cómo juego {civ}?",
+}
 
 
 def _detect_lang(text: str) -> str:
@@ -31,7 +63,10 @@ def _detect_lang(text: str) -> str:
 
 
 def _get_guide_cache_key(request: ChatRequest) -> str | None:
-    """Return a cache key like 'french:es' for simple civ guide queries, else None."""
+    """Return a cache key like '<assets hash>:french:es' for simple civ guide queries, else None.
+
+    The prompt/tools hash prefix makes a prompt edit invalidate stale answers.
+    """
     if len(request.messages) != 1 or request.messages[0].role != "user":
         return None
     msg = request.messages[0].content.lower()
@@ -43,7 +78,30 @@ def _get_guide_cache_key(request: ChatRequest) -> str | None:
                "build order", "matchup", "parche", "patch", "nerf", "buff"]
     if any(x in msg for x in exclude):
         return None
-    return f"{civ}:{_detect_lang(msg)}"
+    return f"{PROMPT_ASSETS.hash}:{civ}:{_detect_lang(msg)}"
+
+
+def _text_events(text: str, message_events: bool) -> list[dict]:
+    """Complete answer text as one "message" event, or a few large "token" events."""
+    if message_events:
+        return [{"type": "message", "content": text}]
+    return [
+        {"type": "token", "content": text[i:i + RESPONSE_REPLAY_CHUNK_CHARS]}
+        for i in range(0, len(text), RESPONSE_REPLAY_CHUNK_CHARS)
+    ]
+
+
+def _replay_cached_answer(answer: dict, message_events: bool) -> list[dict]:
+    """Turn a cached {"text", "sources"} answer back into a short list of SSE events.
+
+    Clients that understand it get the whole text as one "message" event;
+    everyone else gets a few large "token" events instead of hundreds of tiny ones.
+    """
+    events = _text_events(answer.get("text", ""), message_events)
+    if answer.get("sources"):
+        events.append({"type": "sources", "sources": answer["sources"]})
+    events.append({"type": "done"})
+    return events
 
 SYSTEM_PROMPT = """You are AoE4 Bot, an expert AI assistant for Age of Empires IV. Knowledgeable, friendly, and always accurate with data.
 
@@ -221,25 +279,305 @@ MAA (Man-at-Arms), FC (Fast Castle), TC (Town Center), BO (build order), eco (ec
 ## Personality
 A well-informed coaching companion. Casual and enthusiastic but always data-driven. Like that friend who knows everything about AoE4."""
 
+# Tools that return a finished table/stat block, worth showing as-is while the
+# model writes its answer (tool_output events)
+PREVIEW_TOOLS = {
+    "get_civ_stats", "get_matchup_stats", "get_map_stats", "get_leaderboard",
+    "get_esports_leaderboard", "get_ageup_stats", "query_unit_stats",
+    "query_building_stats", "query_technology", "compare_units",
+}
+
+# Serialized once; each OpenAI call only encodes the conversation messages
+PROMPT_ASSETS = PromptAssets(SYSTEM_PROMPT, TOOL_DEFINITIONS)
+
+
+async def _execute_tool(
+    tool_name: str, tool_args: dict, trace: Trace, conversation_id: str | None = None,
+) -> tuple[str, list[Source], dict]:
+    """Run a registered tool, turning failures into a message for the model.
+
+    Returns (result, sources, span); the trace span carries duration, cache
+    outcome and ok for progress events. Arguments are canonicalized first
+    (civ aliases, maps, modes, defaults dropped) so caches and memo keys match
+    across phrasings. With a conversation_id, successful results backed by
+    data (with sources; failures and "not found" messages have none) are
+    memoized for the tool's memo TTL, and repeat calls in the same
+    conversation return them without running the tool.
+    """
+    tool_fn = TOOL_REGISTRY.get(tool_name)
+    if not tool_fn:
+        span = trace.add("tool", time.perf_counter(), tool=tool_name, cache="none", ok=False)
+        return f"Unknown tool: {tool_name}. Available tools: {', '.join(TOOL_REGISTRY.keys())}", [], span
+    tool_args = normalize_args(tool_fn, tool_args)
+
+    if conversation_id:
+        memoized = conversation_memo.get(conversation_id, tool_name, tool_args)
+        if memoized is not None:
+            span = trace.add("tool", time.perf_counter(), tool=tool_name, cache="memo", ok=True)
+            return (*memoized, span)
+
+    activity: dict = {}
+    token = cache_activity.set(activity)
+    start = time.perf_counter()
+    try:
+        result, sources = await tool_fn(**tool_args)
+        ok = True
+        if conversation_id and sources:
+            conversation_memo.set(
+                conversation_id, tool_name, tool_args, result, sources,
+                ttl=CONVERSATION_MEMO_TOOL_TTLS.get(tool_name),
+            )
+    except Exception as e:
+        ok = False
+        result, sources = (
+            f"Error executing {tool_name}: {str(e)}. "
+            f"You may try a different tool or answer based on your knowledge, "
+            f"but mention that live data was unavailable."
+        ), []
+    finally:
+        cache_activity.reset(token)
+    if activity.get("misses"):
+        cache_outcome = "miss"
+    elif activity.get("hits"):
+        cache_outcome = "hit"
+    else:
+        cache_outcome = "none"
+    span = trace.add("tool", start, tool=tool_name, cache=cache_outcome, ok=ok)
+    return result, sources, span
+
+
+def _maybe_prefetch(tc: dict, trace: Trace, conversation_id: str | None) -> bool:
+    """Speculatively start a tool call as soon as its streamed arguments form valid JSON.
+
+    The task is awaited once the stream finishes, so tool latency overlaps
+    with the rest of the model's generation (e.g. the next tool call's args).
+    Returns True when a task was started.
+    """
+    if "task" in tc or not tc["function"]["name"]:
+        return False
+    args_str = tc["function"]["arguments"]
+    if not args_str.rstrip().endswith("}"):
+        return False
+    try:
+        args = json.loads(args_str)
+    except json.JSONDecodeError:
+        return False
+    if not isinstance(args, dict):
+        return False
+    tc["prefetched_args"] = args_str
+    tc["task"] = asyncio.create_task(
+        _execute_tool(tc["function"]["name"], args, trace, conversation_id)
+    )
+    return True
+
+
+def _count_rows(result: str) -> int:
+    """Data rows in a tool's markdown output: table rows, else list items."""
+    lines = result.splitlines()
+    table = [line for line in lines if line.lstrip().startswith("|")]
+    if table:
+        separators = sum(1 for line in table if set(line.strip()) <= set("|-: "))
+        # Each separator line follows one header row
+        return len(table) - 2 * separators
+    return sum(1 for line in lines if line.lstrip().startswith(("- ", "* ")))
+
+
+def _tool_start_event(request: ChatRequest, call_id: str, tool_name: str) -> dict:
+    if request.tool_events:
+        return {"type": "tool_start", "id": call_id, "tool": tool_name}
+    return {"type": "tool_call", "content": tool_name}
+
+
+def _tool_end_events(
+    request: ChatRequest, call_id: str, tool_name: str, run: tuple[str, list[Source], dict],
+) -> list[dict]:
+    """tool_end progress event, plus the tool's own output for table-style tools if requested."""
+    if not request.tool_events:
+        return []
+    result, _, span = run
+    events = [{
+        "type": "tool_end",
+        "id": call_id,
+        "tool": tool_name,
+        "duration_ms": span["duration_ms"],
+        "cache": span["cache"],
+        "ok": span["ok"],
+        "rows": _count_rows(result) if span["ok"] else 0,
+    }]
+    if request.tool_output and span["ok"] and tool_name in PREVIEW_TOOLS:
+        events.append({"type": "tool_output", "id": call_id, "tool": tool_name, "content": result})
+    return events
+
+
+def _cancel_prefetches(tool_calls_by_index: dict[int, dict]):
+    for tc in tool_calls_by_index.values():
+        task = tc.get("task")
+        if task and not task.done():
+            task.cancel()
+
+
+def _abandon_prefetches(request: ChatRequest, tool_calls_by_index: dict[int, dict]) -> list[dict]:
+    """Cancel prefetched calls whose results won't be used; a tool_end closes each tool_start sent."""
+    _cancel_prefetches(tool_calls_by_index)
+    if not request.tool_events:
+        return []
+    return [
+        {
+            "type": "tool_end",
+            "id": tc["id"],
+            "tool": tc["function"]["name"],
+            "duration_ms": 0,
+            "cache": "none",
+            "ok": False,
+            "cancelled": True,
+            "rows": 0,
+        }
+        for tc in tool_calls_by_index.values()
+        if "task" in tc
+    ]
+
+
+CAPTION_PROMPT = (
+    "You are AoE4 Bot. The user's question was answered with the data below, which "
+    "they can already see. Add one or two short sentences with the key takeaway. "
+    "Don't repeat the table or list numbers already shown."
+)
+
+
+async def _caption_tokens(question: str, data: str, trace: Trace) -> AsyncGenerator[str, None]:
+    """Stream a short LLM takeaway for a direct answer; failures just end the caption."""
+    model = OPENAI_PLANNER_MODEL or OPENAI_MODEL
+    call_start = time.perf_counter()
+    call_span = {"model": model, "phase": "caption", "ttft_ms": None}
+    response = None
+    try:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": CAPTION_PROMPT},
+                {"role": "user", "content": f"{question}\n\n{data}"},
+            ],
+            max_tokens=FAST_PATH_CAPTION_MAX_TOKENS,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        first = True
+        async for chunk in response:
+            if call_span["ttft_ms"] is None:
+                call_span["ttft_ms"] = round((time.perf_counter() - call_start) * 1000, 1)
+            if chunk.usage:
+                call_span["prompt_tokens"] = chunk.usage.prompt_tokens
+                call_span["completion_tokens"] = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                content = chunk.choices[0].delta.content
+                yield f"\n\n{content}" if first else content
+                first = False
+    except Exception as e:
+        call_span["error"] = str(e)
+    finally:
+        trace.add("openai", call_start, **call_span)
+        if response is not None:
+            await response.close()
+
+
+def _memo_context_messages(conversation_id: str) -> list[dict]:
+    """Tool call/result messages replaying this conversation's most recent tool results."""
+    recent = []
+    budget = CONVERSATION_MEMO_CONTEXT_CHARS
+    latest = conversation_memo.recent(conversation_id, CONVERSATION_MEMO_CONTEXT_RESULTS)
+    for tool_name, args, result in reversed(latest):
+        if len(result) > budget:
+            break
+        budget -= len(result)
+        recent.append((tool_name, args, result))
+    if not recent:
+        return []
+    recent.reverse()
+    return [
+        {
+            "role": "system",
+            "content": "Data already fetched earlier in this conversation follows. "
+                       "Reuse it instead of calling the same tool again.",
+        },
+        {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_memo_{i}",
+                    "type": "function",
+                    "function": {"name": tool_name, "arguments": json.dumps(args)},
+                }
+                for i, (tool_name, args, _) in enumerate(recent)
+            ],
+        },
+        *(
+            {"role": "tool", "tool_call_id": f"call_memo_{i}", "content": result}
+            for i, (_, _, result) in enumerate(recent)
+        ),
+    ]
+
 
 async def chat_stream(request: ChatRequest) -> AsyncGenerator[dict, None]:
-    """Stream chat responses with tool calling support."""
+    """Stream chat responses with tool calling support, tracing every stage."""
+    trace = Trace()
+    try:
+        # aclosing: if the client disconnects, the turn is closed right away
+        # (OpenAI stream released, prefetched tools cancelled) instead of at GC
+        async with aclosing(_chat_turn(request, trace)) as turn:
+            async for event in turn:
+                if event["type"] == "done" and request.timing:
+                    yield {"type": "timing", **trace.summary()}
+                yield event
+    except (asyncio.CancelledError, GeneratorExit):
+        trace.cancelled = True
+        raise
+    finally:
+        trace.finish()
+
 
+async def _chat_turn(request: ChatRequest, trace: Trace) -> AsyncGenerator[dict, None]:
     # --- Cache check: instant replay for repeated civ guide queries ---
     cache_key = _get_guide_cache_key(request)
-    if cache_key and cache_key in _guide_cache:
-        ts, cached_events = _guide_cache[cache_key]
-        if time.time() - ts < GUIDE_CACHE_TTL:
-            for event in cached_events:
+    if cache_key:
+        with trace.span("cache", cache="guide") as span:
+            cached_answer = await guide_cache.aget(cache_key)
+            span["hit"] = cached_answer is not None
+        if cached_answer is not None:
+            for event in _replay_cached_answer(cached_answer, request.message_events):
                 yield event
             return
-        else:
-            del _guide_cache[cache_key]
 
-    collected_events: list[dict] | None = [] if cache_key else None
+    # --- Direct answer: one deterministic tool's markdown is the whole reply ---
+    last = request.messages[-1] if request.messages else None
+    direct = None
+    if FAST_PATH_ENABLED and last and last.role == "user" and _detect_lang(last.content) == "en":
+        direct = route_direct(expand_query(last.content))
+    if direct:
+        tool_name, tool_args = direct
+        yield _tool_start_event(request, "call_direct", tool_name)
+        run = await _execute_tool(tool_name, tool_args, trace, request.conversation_id)
+        # tool_end only: the output itself is the answer below
+        for event in _tool_end_events(request, "call_direct", tool_name, run)[:1]:
+            yield event
+        result, sources, span = run
+        if span["ok"] and sources:
+            for event in _text_events(result, request.message_events):
+                yield event
+            if FAST_PATH_CAPTION:
+                async with aclosing(_caption_tokens(last.content, result, trace)) as caption:
+                    async for token in caption:
+                        yield {"type": "token", "content": token}
+            yield {"type": "sources", "sources": [s.model_dump() for s in sources]}
+            yield {"type": "done"}
+            return
+        # Error or nothing found: let the model deal with it
 
-    # Build message history
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    # Answer text is collected as parts and coalesced once when caching
+    collected_text: list[str] | None = [] if cache_key else None
+
+    # Build message history (the system prompt is added by PROMPT_ASSETS.body)
+    messages = []
     for msg in request.messages:
         content = msg.content
         # Expand abbreviations in user messages
@@ -247,19 +585,72 @@ async def chat_stream(request: ChatRequest) -> AsyncGenerator[dict, None]:
             content = expand_query(content)
         messages.append({"role": msg.role, "content": content})
 
+    conversation_id = request.conversation_id
+    if conversation_id and len(request.messages) > 1:
+        # Earlier tool results aren't in the client's history: put the latest back
+        messages[-1:-1] = _memo_context_messages(conversation_id)
+
     all_sources: list[Source] = []
 
-    # Tool call loop
+    # --- Intent router: pre-execute obvious tools, skipping the tool-selection round-trip ---
+    planned = route(messages[-1]["content"]) if messages and messages[-1]["role"] == "user" else []
+    if planned:
+        tasks = []
+        for i, (tool_name, args) in enumerate(planned):
+            yield _tool_start_event(request, f"call_router_{i}", tool_name)
+            tasks.append(asyncio.create_task(_execute_tool(tool_name, args, trace, conversation_id)))
+        try:
+            # Report each tool as it finishes; results are read in order below
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    i = tasks.index(task)
+                    for event in _tool_end_events(request, f"call_router_{i}", planned[i][0], task.result()):
+                        yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+        # Inject as if the model had requested these calls itself
+        messages.append({
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_router_{i}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(args)},
+                }
+                for i, (name, args) in enumerate(planned)
+            ],
+        })
+        for i, task in enumerate(tasks):
+            result, sources, _ = task.result()
+            all_sources.extend(sources)
+            messages.append({"role": "tool", "tool_call_id": f"call_router_{i}", "content": result})
+
+    # Tool call loop. With a planner model the turn has two phases: "plan"
+    # iterations (planner + tools, text not streamed) until it stops calling
+    # tools, then one "answer" iteration where OPENAI_MODEL writes the reply.
+    planning = bool(OPENAI_PLANNER_MODEL)
     for iteration in range(MAX_TOOL_CALLS_PER_TURN):
+        if planning and iteration == MAX_TOOL_CALLS_PER_TURN - 1:
+            planning = False  # always leave room for the answer
+        if planning:
+            phase, model, with_tools = "plan", OPENAI_PLANNER_MODEL, True
+        elif OPENAI_PLANNER_MODEL:
+            # Tools were chosen by the planner; the answer model only synthesizes
+            phase, model, with_tools = "answer", OPENAI_MODEL, False
+        else:
+            phase, model, with_tools = "single", OPENAI_MODEL, True
+
+        call_start = time.perf_counter()
+        call_span = {"model": model, "phase": phase, "iteration": iteration, "ttft_ms": None}
         try:
-            response = await client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=messages,
-                tools=TOOL_DEFINITIONS,
-                stream=True,
-            )
+            response = await stream_completion(client, PROMPT_ASSETS.body(model, messages, with_tools))
         except Exception as e:
-            collected_events = None  # Don't cache errors
+            trace.add("openai", call_start, error=True, **call_span)
+            collected_text = None  # Don't cache errors
             yield {"type": "error", "content": f"Error connecting to OpenAI: {str(e)}"}
             return
 
@@ -270,6 +661,12 @@ async def chat_stream(request: ChatRequest) -> AsyncGenerator[dict, None]:
 
         try:
             async for chunk in response:
+                if call_span["ttft_ms"] is None:
+                    call_span["ttft_ms"] = round((time.perf_counter() - call_start) * 1000, 1)
+                # Final chunk (include_usage) carries token counts and no choices
+                if chunk.usage:
+                    call_span["prompt_tokens"] = chunk.usage.prompt_tokens
+                    call_span["completion_tokens"] = chunk.usage.completion_tokens
                 choice = chunk.choices[0] if chunk.choices else None
                 if not choice:
                     continue
@@ -277,13 +674,19 @@ async def chat_stream(request: ChatRequest) -> AsyncGenerator[dict, None]:
                 delta = choice.delta
                 finish_reason = choice.finish_reason
 
-                # Stream text content
+                # Planner started writing an answer instead of calling tools:
+                # stop it and hand over to the answer model
+                if phase == "plan" and delta and delta.content and not tool_calls_by_index:
+                    call_span["planner_answered"] = True
+                    break
+
+                # Stream text content (planner text is kept out of the answer)
                 if delta and delta.content:
                     full_content += delta.content
-                    event = {"type": "token", "content": delta.content}
-                    if collected_events is not None:
-                        collected_events.append(event)
-                    yield event
+                    if phase != "plan":
+                        if collected_text is not None:
+                            collected_text.append(delta.content)
+                        yield {"type": "token", "content": delta.content}
 
                 # Accumulate tool calls
                 if delta and delta.tool_calls:
@@ -302,11 +705,26 @@ async def chat_stream(request: ChatRequest) -> AsyncGenerator[dict, None]:
                                 tc["function"]["name"] += tc_delta.function.name
                             if tc_delta.function.arguments:
                                 tc["function"]["arguments"] += tc_delta.function.arguments
+                        if _maybe_prefetch(tc, trace, conversation_id):
+                            yield _tool_start_event(request, tc["id"], tc["function"]["name"])
 
         except Exception as e:
-            collected_events = None  # Don't cache errors
+            trace.add("openai", call_start, error=True, **call_span)
+            for event in _abandon_prefetches(request, tool_calls_by_index):
+                yield event
+            collected_text = None  # Don't cache errors
             yield {"type": "error", "content": f"Stream error: {str(e)}"}
             return
+        except BaseException:
+            # Client went away mid-stream: stop speculative tools too
+            trace.add("openai", call_start, cancelled=True, **call_span)
+            _cancel_prefetches(tool_calls_by_index)
+            raise
+        finally:
+            # Releases the HTTP connection, so OpenAI stops generating on disconnect
+            await response.close()
+
+        trace.add("openai", call_start, finish_reason=finish_reason, **call_span)
 
         # If model wants to call tools
         if finish_reason == "tool_calls" and tool_calls_by_index:
@@ -329,63 +747,91 @@ async def chat_stream(request: ChatRequest) -> AsyncGenerator[dict, None]:
             messages.append(assistant_msg)
 
             # Execute each tool call
-            for tc in sorted(tool_calls_by_index.values(), key=lambda x: x["id"]):
-                tool_name = tc["function"]["name"]
-                tool_args_str = tc["function"]["arguments"]
-                tool_id = tc["id"]
-
-                # Emit tool_call event so frontend can show which tool is running
-                yield {"type": "tool_call", "content": tool_name}
-
-                try:
-                    tool_args = json.loads(tool_args_str) if tool_args_str else {}
-                except json.JSONDecodeError:
-                    tool_args = {}
-
-                # Execute tool
-                tool_fn = TOOL_REGISTRY.get(tool_name)
-                if tool_fn:
-                    try:
-                        result, sources = await tool_fn(**tool_args)
-                        all_sources.extend(sources)
-                    except Exception as e:
-                        result = (
-                            f"Error executing {tool_name}: {str(e)}. "
-                            f"You may try a different tool or answer based on your knowledge, "
-                            f"but mention that live data was unavailable."
-                        )
-                else:
-                    result = f"Unknown tool: {tool_name}. Available tools: {', '.join(TOOL_REGISTRY.keys())}"
-
-                # Add tool result to messages
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_id,
-                    "content": result,
-                })
+            try:
+                for tc in sorted(tool_calls_by_index.values(), key=lambda x: x["id"]):
+                    tool_name = tc["function"]["name"]
+                    tool_args_str = tc["function"]["arguments"]
+                    tool_id = tc["id"]
+
+                    task = tc.get("task")
+                    if task and tc["prefetched_args"] == tool_args_str:
+                        # Already running since the arguments finished streaming
+                        # (its tool_start event went out then)
+                        result, sources, span = await task
+                    else:
+                        if task:
+                            # Arguments changed after the prefetch: rerun under the same id,
+                            # whose tool_start already went out
+                            task.cancel()
+                        else:
+                            # Emit start event so frontend can show which tool is running
+                            yield _tool_start_event(request, tool_id, tool_name)
+                        try:
+                            tool_args = json.loads(tool_args_str) if tool_args_str else {}
+                        except json.JSONDecodeError:
+                            tool_args = {}
+                        result, sources, span = await _execute_tool(tool_name, tool_args, trace, conversation_id)
+                    for event in _tool_end_events(request, tool_id, tool_name, (result, sources, span)):
+                        yield event
+                    all_sources.extend(sources)
+
+                    # Add tool result to messages
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tool_id,
+                        "content": result,
+                    })
+            except BaseException:
+                # Cancelled (client disconnect) while awaiting a tool: drop the rest
+                _cancel_prefetches(tool_calls_by_index)
+                raise
 
             # Continue the loop — OpenAI will be called again with tool results
             continue
 
+        elif phase == "plan":
+            # Planning done; the answer model gets the tool results next
+            for event in _abandon_prefetches(request, tool_calls_by_index):
+                yield event
+            planning = False
+            continue
+
         else:
             # No more tool calls, we're done
+            for event in _abandon_prefetches(request, tool_calls_by_index):
+                yield event
             break
 
     # Emit sources
-    if all_sources:
-        src_event = {
-            "type": "sources",
-            "sources": [s.model_dump() for s in all_sources],
-        }
-        if collected_events is not None:
-            collected_events.append(src_event)
-        yield src_event
+    source_dicts = [s.model_dump() for s in all_sources]
+    if source_dicts:
+        yield {"type": "sources", "sources": source_dicts}
 
-    done_event = {"type": "done"}
-    if collected_events is not None:
-        collected_events.append(done_event)
-    yield done_event
+    yield {"type": "done"}
 
     # Save to cache if this was a cacheable civ guide query
-    if cache_key and collected_events:
-        _guide_cache[cache_key] = (time.time(), collected_events)
+    if cache_key and collected_text:
+        guide_cache.set(cache_key, {"text": "".join(collected_text), "sources": source_dicts})
+
+
+async def prewarm_guide_cache(langs: tuple[str, ...] = ("en", "es")) -> int:
+    """Pre-generate civ guide answers for every civ and language not already cached.
+
+    Runs sequentially to stay well within OpenAI rate limits. Returns the
+    number of answers generated.
+    """
+    generated = 0
+    for civ in CIVILIZATIONS:
+        for lang in langs:
+            prompt = PREWARM_PROMPTS[lang].format(civ=CIV_DISPLAY_NAMES[civ])
+            request = ChatRequest(messages=[ChatMessage(role="user", content=prompt)])
+            key = _get_guide_cache_key(request)
+            if not key or key in guide_cache:
+                continue
+            async for event in chat_stream(request):
+                if event["type"] == "error":
+                    print(f"[prewarm] {key}: {event['content']}")
+                    break
+            else:
+                generated += 1
+    return generated
@@ -5,29 +5,128 @@ load_dotenv()
 
 # --- API Keys ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+# Required in the X-Admin-Token header of admin endpoints (/api/cache/stats); unset = endpoints disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 # --- LLM ---
 OPENAI_MODEL = "gpt-4.1-mini"
+# Optional cheaper/faster model that only picks tool calls; OPENAI_MODEL then just
+# writes the final answer. Empty = one model does both (no extra round-trip).
+OPENAI_PLANNER_MODEL = os.getenv("OPENAI_PLANNER_MODEL", "")
 
-# --- External API URLs ---
-AOE4WORLD_BASE = "https://aoe4world.com/api/v0"
-AOE4DATA_BASE = "https://data.aoe4world.com"
-AOE4GUIDES_BASE = "https://aoe4guides.com"
-WIKI_BASE = "https://ageofempires.fandom.com/api.php"
-LIQUIPEDIA_BASE = "https://liquipedia.net/ageofempires/api.php"
+# --- External API URLs (overridable so the load-test harness can point at local stubs) ---
+AOE4WORLD_BASE = os.getenv("AOE4WORLD_BASE", "https://aoe4world.com/api/v0")
+AOE4DATA_BASE = os.getenv("AOE4DATA_BASE", "https://data.aoe4world.com")
+AOE4GUIDES_BASE = os.getenv("AOE4GUIDES_BASE", "https://aoe4guides.com")
+WIKI_BASE = os.getenv("WIKI_BASE", "https://ageofempires.fandom.com/api.php")
+LIQUIPEDIA_BASE = os.getenv("LIQUIPEDIA_BASE", "https://liquipedia.net/ageofempires/api.php")
 
 # --- Rate limits ---
 LIQUIPEDIA_MIN_INTERVAL = 2.0  # seconds between requests
 
+# --- Upstream circuit breakers (per host) ---
+CIRCUIT_FAILURE_THRESHOLD = 5   # consecutive errors/timeouts/5xx/429 before failing fast
+CIRCUIT_RESET_TIMEOUT = 30      # seconds open before one probe request is let through
+
 # --- Cache TTLs (seconds) ---
 CACHE_TTL_STATS = 3600      # 1 hour for civ stats/winrates
 CACHE_TTL_PLAYERS = 300     # 5 minutes for player data
 CACHE_TTL_WIKI = 86400      # 24 hours for wiki pages
 CACHE_TTL_BUILDS = 3600     # 1 hour for build orders
 CACHE_TTL_LIQUIPEDIA = 3600 # 1 hour for liquipedia
+# Rendered tool output on top of the cached payloads above; re-rendering is cheap
+CACHE_TTL_RENDER = 60
+
+# --- Tool cache bounds (per worker) ---
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # approximate
+CACHE_SWEEP_INTERVAL = 60   # seconds between background expiry sweeps
+CACHE_REFRESH_AHEAD = 0.1   # reload hot keys in the last 10% of their TTL
+CACHE_REFRESH_MIN_HITS = 2  # hits before a key counts as hot
+CACHE_NEGATIVE_TTL = 30     # seconds a failed upstream load is remembered
+
+# --- Shared cache backend (multi-worker deployments) ---
+# "memory": per-process dicts (single worker). "sqlite": every worker on the host
+# reads/writes one SQLite file, so cache hits are shared instead of split N ways.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+SHARED_CACHE_DB = os.getenv(
+    "SHARED_CACHE_DB",
+    os.path.join(os.path.dirname(__file__), "data", "shared_cache.db"),
+)
+
+# --- Upstream payload cache (L2, on disk) ---
+# Raw JSON from aoe4world/aoe4guides/Fandom/Liquipedia, zlib-compressed in SQLite,
+# so a restart or deploy doesn't start cold. Set to "" to disable.
+UPSTREAM_CACHE_DB = os.getenv(
+    "UPSTREAM_CACHE_DB",
+    os.path.join(os.path.dirname(__file__), "data", "upstream_cache.db"),
+)
+# Load unexpired payloads into the memory cache on startup
+UPSTREAM_CACHE_PRELOAD = os.getenv("UPSTREAM_CACHE_PRELOAD", "1") == "1"
+
+# --- Cache warming (hot stats/leaderboard/build payloads refreshed in the background) ---
+# Off by default (local dev, tests); enable in production
+CACHE_WARM_ENABLED = os.getenv("CACHE_WARM_ENABLED", "") == "1"
+CACHE_WARM_INTERVAL = int(os.getenv("CACHE_WARM_INTERVAL", "600"))  # seconds between passes
+CACHE_WARM_MODES = os.getenv("CACHE_WARM_MODES", "rm_solo").split(",")
+CACHE_WARM_HOST_SPACING = 1.0  # min seconds between warm requests to one host
+CACHE_WARM_JITTER = 0.2        # +-20% on the pass interval, up to +20% on the spacing
+# The first pass waits a random 0..N seconds, so workers starting together don't fetch in lockstep
+CACHE_WARM_START_DELAY = float(os.getenv("CACHE_WARM_START_DELAY", "30"))
+# Only the process holding this lock warms; the others read its payloads from the disk tier.
+# Without a disk tier there is nothing to share, so every process warms its own memory.
+CACHE_WARM_LOCK = f"{UPSTREAM_CACHE_DB}.warmer.lock" if UPSTREAM_CACHE_DB else ""
+
+# --- Cache stats (/api/cache/stats) ---
+CACHE_STATS_TOP_KEYS = 10  # hottest keys listed per prefix
+# Show the tool arguments behind hashed keys (user queries, player ids): debugging only
+CACHE_STATS_SHOW_ARGS = os.getenv("CACHE_STATS_SHOW_ARGS", "") == "1"
+# Expiry distribution buckets: (upper bound in seconds, label); later entries fall in ">=1d"
+CACHE_STATS_EXPIRY_BUCKETS = ((0, "expired"), (60, "<1m"), (600, "<10m"), (3600, "<1h"), (86400, "<1d"))
+
+# --- Response cache (full civ guide answers) ---
+RESPONSE_CACHE_TTL = 3600         # 1 hour
+RESPONSE_CACHE_MAX_ENTRIES = 256  # 22 civs x 2 languages fits with plenty of headroom
+RESPONSE_REPLAY_CHUNK_CHARS = 1024  # cached answers are replayed in a few large token events
+# SQLite file so cached answers survive restarts; set to "" to keep it in memory only
+RESPONSE_CACHE_DB = os.getenv(
+    "RESPONSE_CACHE_DB",
+    os.path.join(os.path.dirname(__file__), "data", "response_cache.db"),
+)
+# Pre-generate all civ guides (22 civs x 2 languages) in the background on startup
+PREWARM_GUIDES_ON_STARTUP = os.getenv("PREWARM_GUIDES_ON_STARTUP", "") == "1"
+
+# --- Direct answers (one deterministic tool's table is the whole reply, no LLM) ---
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
+# Append a 1-2 sentence LLM takeaway after the table (adds a small model call)
+FAST_PATH_CAPTION = os.getenv("FAST_PATH_CAPTION", "") == "1"
+FAST_PATH_CAPTION_MAX_TOKENS = 80
+
+# --- Conversation tool memo (repeat tool calls within one chat) ---
+CONVERSATION_MEMO_TTL = 1800            # forget a conversation after 30 min idle
+CONVERSATION_MEMO_MAX = 1000            # conversations kept per worker
+CONVERSATION_MEMO_MAX_ENTRIES = 32      # tool results kept per conversation
+CONVERSATION_MEMO_CONTEXT_RESULTS = 4   # recent results put back into the model's context
+CONVERSATION_MEMO_CONTEXT_CHARS = 12000  # ...as long as they fit in this many characters
+# Live data is only memoized as long as the tool cache keeps it; other tools use CONVERSATION_MEMO_TTL
+CONVERSATION_MEMO_TOOL_TTLS = {
+    "search_player": CACHE_TTL_PLAYERS,
+    "get_player_profile": CACHE_TTL_PLAYERS,
+    "get_player_matches": CACHE_TTL_PLAYERS,
+    "get_leaderboard": CACHE_TTL_PLAYERS,
+    "get_esports_leaderboard": CACHE_TTL_PLAYERS,
+}
+
+# --- SSE streaming ---
+SSE_COALESCE_WINDOW = 0.03     # seconds to batch tokens before emitting one event
+SSE_COALESCE_MAX_CHARS = 256   # flush earlier once this much text is buffered
+SSE_SEND_BUFFER_EVENTS = 64    # per-connection events queued for a slow client before the turn pauses
+SSE_DISCONNECT_POLL_INTERVAL = 0.5  # seconds between client disconnect checks
+SSE_SEND_TIMEOUT = 30          # drop clients that stop reading for this long (seconds)
 
 # --- Limits ---
 MAX_TOOL_CALLS_PER_TURN = 8
+CHAT_RATE_LIMIT = os.getenv("CHAT_RATE_LIMIT", "20/minute")  # per client IP on /api/chat
 
 # --- Civilization mappings ---
 # Canonical names used by aoe4world API
@@ -0,0 +1,102 @@
+"""Per-conversation memo of tool results.
+
+The client only sends back user/assistant text, so on every follow-up the
+model re-requests data it already fetched ("knight stats", "english vs
+french"). Results are memoized under the client-supplied conversation id,
+keyed like the tool cache (cache.cache_key over the canonical arguments,
+see tools.normalize, applied by the dispatcher first), so repeat calls return
+instantly and recent results can be put back into the model's context.
+
+Each result also expires on its own (the tool's data TTL, see
+CONVERSATION_MEMO_TOOL_TTLS): a long, active conversation must still see a
+new match or ladder change instead of its first answer forever.
+"""
+
+import time
+from collections import OrderedDict
+
+from cache import approx_size, cache_key
+
+
+class ConversationMemo:
+    """Bounded, idle-expiring map of conversation id -> {tool key: result}, each result with its own expiry."""
+
+    def __init__(self, max_conversations: int = 1000, max_entries: int = 32, ttl: int = 1800):
+        self.max_conversations = max_conversations
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # conversation id -> (last used, OrderedDict[key, (tool, args, result, sources, expires_at)])
+        self._conversations: OrderedDict[str, tuple[float, OrderedDict]] = OrderedDict()
+        # tool name -> {"hits", "misses"}, for cache_stats
+        self._lookups: dict[str, dict[str, int]] = {}
+
+    def _entries(self, conversation_id: str) -> OrderedDict | None:
+        item = self._conversations.get(conversation_id)
+        if item is None:
+            return None
+        last_used, entries = item
+        if time.time() - last_used > self.ttl:
+            del self._conversations[conversation_id]
+            return None
+        self._conversations[conversation_id] = (time.time(), entries)
+        self._conversations.move_to_end(conversation_id)
+        return entries
+
+    def get(self, conversation_id: str, tool_name: str, args: dict) -> tuple | None:
+        """Return (result, sources) for a repeat call, or None."""
+        entries = self._entries(conversation_id)
+        key = cache_key(tool_name, args)
+        hit = entries.get(key) if entries is not None else None
+        if hit is not None and time.time() >= hit[4]:
+            del entries[key]
+            hit = None
+        lookups = self._lookups.setdefault(tool_name, {"hits": 0, "misses": 0})
+        if hit is None:
+            lookups["misses"] += 1
+            return None
+        lookups["hits"] += 1
+        _, _, result, sources, _ = hit
+        return result, sources
+
+    def set(
+        self, conversation_id: str, tool_name: str, args: dict, result: str, sources: list,
+        ttl: float | None = None,
+    ):
+        """Memoize a result for ttl seconds (default: the idle TTL of the conversation)."""
+        entries = self._entries(conversation_id)
+        if entries is None:
+            entries = OrderedDict()
+            self._conversations[conversation_id] = (time.time(), entries)
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+        key = cache_key(tool_name, args)
+        entries[key] = (tool_name, args, result, sources, time.time() + (self.ttl if ttl is None else ttl))
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def recent(self, conversation_id: str, limit: int) -> list[tuple[str, dict, str]]:
+        """Most recent unexpired (tool, args, result) of a conversation, oldest first."""
+        entries = self._entries(conversation_id)
+        if not entries:
+            return []
+        now = time.time()
+        live = [(tool, args, result) for tool, args, result, _, expires_at in entries.values() if now < expires_at]
+        return live[-limit:]
+
+    def entry_info(self) -> list[tuple[str, int, int, float, dict]]:
+        """(key, approx bytes, hits, expires_at, arguments) per memoized result, for cache_stats.
+
+        Hits are only counted per tool (lookup_counts), not per result.
+        """
+        return [
+            (key, approx_size((result, sources)), 0, min(expires_at, last_used + self.ttl), args)
+            for last_used, entries in self._conversations.values()
+            for key, (_, args, result, sources, expires_at) in entries.items()
+        ]
+
+    def lookup_counts(self) -> dict[str, dict[str, int]]:
+        return {tool: dict(counts) for tool, counts in self._lookups.items()}
+
+    def __len__(self) -> int:
+        return len(self._conversations)
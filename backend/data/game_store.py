@@ -151,6 +151,26 @@ class GameStore:
                 unique.append(item)
         return unique
 
+    def classify_name(self, name: str) -> str | None:
+        """Return "unit", "building" or "technology" if name exactly matches an entry.
+
+        Only exact index hits (after abbreviation expansion and naive
+        de-pluralisation) count, so callers can trust the match without
+        an LLM confirming it.
+        """
+        resolved = self._resolve_name(name)
+        candidates = [resolved]
+        if resolved.endswith("s"):
+            candidates.append(resolved[:-1])
+        for candidate in candidates:
+            if candidate in self.units:
+                return "unit"
+            if candidate in self.buildings:
+                return "building"
+            if candidate in self.technologies:
+                return "technology"
+        return None
+
     def search_units(self, name: str, civ: str | None = None) -> list:
         return self._search(self.units, name, civ, raw_items=self.units_raw)
 
@@ -8,7 +8,7 @@ import aiohttp
 
 from config import AOE4DATA_BASE
 
-CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
+CACHE_DIR = os.getenv("GAME_DATA_CACHE_DIR", os.path.join(os.path.dirname(__file__), "cache"))
 CACHE_MAX_AGE = 7 * 24 * 3600  # 7 days
 
 DATA_FILES = {
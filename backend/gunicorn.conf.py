@@ -0,0 +1,26 @@
+"""Multi-worker deployment: gunicorn master + uvicorn workers.
+
+The master preloads game data and KB embeddings once and forks workers that
+share them copy-on-write. Set CACHE_BACKEND=sqlite so tool results are
+shared between workers instead of cached once per process (civ guide answers
+always are, through RESPONSE_CACHE_DB).
+
+Usage:
+    cd backend
+    CACHE_BACKEND=sqlite WEB_CONCURRENCY=4 gunicorn main:app -c gunicorn.conf.py
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# SSE answers can stream for a while; don't let gunicorn kill busy workers
+timeout = 120
+graceful_timeout = 30
+
+
+def on_starting(server):
+    from main import preload_shared_data
+    preload_shared_data()
@@ -0,0 +1,233 @@
+"""Deterministic intent router for common question shapes.
+
+For questions like "how to play <civ>", "<civ1> vs <civ2> winrate",
+"<unit> stats" or "build order <civ>" the first LLM call only picks an obvious
+tool. The router recognises these shapes with regexes plus civ/game-data name
+resolution, so chat_stream can run the tools before the first OpenAI call and
+skip a whole model round-trip.
+
+Rules are deliberately conservative: when in doubt, return no plan and let
+the model choose.
+
+route_direct() is stricter still: it only matches when one deterministic tool's
+markdown is the whole answer ("knight stats", "english vs french winrate",
+"leaderboard top 20 germany"), so chat_stream can skip the model entirely.
+"""
+
+import re
+
+from tools.knowledge_base import _detect_civs, CIV_ALIASES as KB_CIV_ALIASES
+from tools.normalize import normalize_mode
+
+# Long, nuanced messages are left to the model
+MAX_ROUTABLE_CHARS = 200
+
+_BUILD_ORDER_RE = re.compile(
+    r"\b(build orders?|orden(?:es)? de construcci[oó]n|apertura)\b", re.IGNORECASE,
+)
+_VERSUS_RE = re.compile(r"(?:\bvs\.?|\bversus\b|\bcontra\b|\bagainst\b)", re.IGNORECASE)
+_WINRATE_RE = re.compile(
+    r"\b(win ?rates?|win percentage|winrate|stats|statistics|estad[ií]sticas|porcentaje)\b",
+    re.IGNORECASE,
+)
+_GUIDE_RE = re.compile(
+    r"\b(how (?:do i |to |should i |can i )?play|c[oó]mo (?:se )?juega|c[oó]mo juego|"
+    r"gu[ií]a|guide)\b",
+    re.IGNORECASE,
+)
+_ENTITY_STATS_RES = [
+    re.compile(
+        r"^(?:what are |show me |give me |dame )?(?:the |las |los )?"
+        r"(?:stats|statistics|estad[ií]sticas|datos)\s+(?:of|for|on|de|del|de la|de los)\s+"
+        r"(?:the |el |la |los |las )?(?P<name>[\w' -]+?)\s*[?.!]*$",
+        re.IGNORECASE,
+    ),
+    re.compile(r"^(?P<name>[\w' -]+?)\s+(?:stats|statistics|estad[ií]sticas)\s*[?.!]*$", re.IGNORECASE),
+]
+
+# Strategy passed through to search_build_orders, matched in the raw or the
+# glossary-expanded text ("fc" -> "Fast Castle", but "castle" -> "Age III")
+_BUILD_STRATEGIES = [
+    ("fast castle", re.compile(r"\bfast (?:castle|age iii)\b", re.IGNORECASE)),
+    ("fast feudal", re.compile(r"\bfast (?:feudal|age ii)\b", re.IGNORECASE)),
+    ("fast imperial", re.compile(r"\bfast (?:imperial|age iv)\b", re.IGNORECASE)),
+    ("2 town center", re.compile(r"\b2 ?(?:town centers?|tcs?)\b", re.IGNORECASE)),
+    ("3 town center", re.compile(r"\b3 ?(?:town centers?|tcs?)\b", re.IGNORECASE)),
+    ("tower rush", re.compile(r"\btower rush\b", re.IGNORECASE)),
+    ("rush", re.compile(r"\brush\b", re.IGNORECASE)),
+    ("boom", re.compile(r"\bboom\b", re.IGNORECASE)),
+    ("aggressive", re.compile(r"\baggressive\b", re.IGNORECASE)),
+    ("defensive", re.compile(r"\bdefensive\b", re.IGNORECASE)),
+]
+
+# Filters a planned matchup call can't express: leave those questions to the model
+_MATCHUP_QUALIFIER_RE = re.compile(
+    r"\b(elo|mmr|rank(?:ed)? level|conqueror|diamond|platinum|gold|silver|bronze|"
+    r"patch|parche|season|temporada|\d{3,4}\+?)\b",
+    re.IGNORECASE,
+)
+
+_ENTITY_TOOLS = {
+    "unit": "query_unit_stats",
+    "building": "query_building_stats",
+    "technology": "query_technology",
+}
+
+_CIV_WORD_RE = re.compile(
+    r"\b(" + "|".join(re.escape(a) for a in sorted(KB_CIV_ALIASES, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+
+# --- Direct answers (route_direct) ---
+
+# Words that may surround a direct-answer question; anything else means the
+# user wants explanation, not just the table
+_FILLER_RE = re.compile(
+    r"\b(what(?:'s| is| are)?|show(?: me)?|give me|list|the|a|of|for|in|on|current|"
+    r"matchup|match ?up|players?|please|pls)\b",
+    re.IGNORECASE,
+)
+_LEADERBOARD_RE = re.compile(r"\b(leaderboards?|ladder|rankings?|ranked)\b", re.IGNORECASE)
+_TOP_N_RE = re.compile(r"\btop\s*(\d+)?\b", re.IGNORECASE)
+_MODE_RE = re.compile(r"\b(1v1|2v2|3v3|4v4|solo|quick ?match|qm)\b", re.IGNORECASE)
+LEADERBOARD_ROWS = 20  # most players get_leaderboard shows per page
+
+# aoe4world country filter codes (country names only: demonyms clash with civs;
+# some names are civ aliases too, so route_direct checks the leaderboard first)
+COUNTRY_CODES = {
+    "germany": "de", "spain": "es", "france": "fr", "uk": "gb", "united kingdom": "gb",
+    "britain": "gb", "usa": "us", "united states": "us", "america": "us", "korea": "kr",
+    "south korea": "kr", "china": "cn", "brazil": "br", "poland": "pl", "russia": "ru",
+    "canada": "ca", "mexico": "mx", "argentina": "ar", "italy": "it", "netherlands": "nl",
+    "sweden": "se", "japan": "jp", "vietnam": "vn", "australia": "au", "finland": "fi",
+    "ukraine": "ua", "turkey": "tr", "denmark": "dk", "norway": "no", "chile": "cl",
+    "colombia": "co", "czechia": "cz", "austria": "at", "belgium": "be", "portugal": "pt",
+}
+_COUNTRY_RE = re.compile(
+    r"\b(" + "|".join(re.escape(c) for c in sorted(COUNTRY_CODES, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+
+
+def _nothing_else(text: str, *patterns: re.Pattern) -> bool:
+    """True when text is only matches of patterns, filler and punctuation."""
+    for pattern in (*patterns, _FILLER_RE):
+        text = pattern.sub(" ", text)
+    return not re.sub(r"[\W_]+", "", text)
+
+
+def _route_entity_stats(text: str, civs: list[str]) -> list[tuple[str, dict]]:
+    """Match "<name> stats" / "stats of <name>", optionally civ-qualified."""
+    from data.game_store import store
+    if store is None or len(civs) > 1:
+        return []
+    for pattern in _ENTITY_STATS_RES:
+        m = pattern.match(text.strip())
+        if not m:
+            continue
+        # "French knight stats" -> name "knight", civ "french"
+        name = _CIV_WORD_RE.sub(" ", m.group("name"))
+        name = re.sub(r"\s+", " ", name).strip(" '")
+        if not name:
+            return []
+        kind = store.classify_name(name)
+        if not kind:
+            return []
+        args: dict = {"name": name}
+        if civs:
+            args["civ"] = civs[0]
+        return [(_ENTITY_TOOLS[kind], args)]
+    return []
+
+
+def route(text: str) -> list[tuple[str, dict]]:
+    """Return the tool calls that obviously answer text, as (tool_name, args) pairs.
+
+    An empty list means the question should go through normal LLM tool selection.
+    """
+    if not text or len(text) > MAX_ROUTABLE_CHARS:
+        return []
+    civs = _detect_civs(text)
+
+    # "build order <civ>" / "fast castle build for french"
+    if _BUILD_ORDER_RE.search(text) and len(civs) == 1:
+        args = {"civ": civs[0]}
+        strategy = next((name for name, pattern in _BUILD_STRATEGIES if pattern.search(text)), None)
+        if strategy:
+            args["strategy"] = strategy
+        return [("search_build_orders", args)]
+
+    # "<civ1> vs <civ2> (winrate) (2v2)"
+    if len(civs) == 2 and _VERSUS_RE.search(text):
+        if _MATCHUP_QUALIFIER_RE.search(text):
+            return []
+        args = {"civ1": civs[0], "civ2": civs[1]}
+        mode = _MODE_RE.search(text)
+        if mode:
+            args["mode"] = normalize_mode(mode.group(1))
+        plan = [("get_matchup_stats", args)]
+        if not _WINRATE_RE.search(text):
+            # Strategy question about the matchup: pro advice + win rate
+            plan.append(("search_pro_content", {"query": text}))
+        return plan
+
+    # "<unit> stats" / "stats of <building>"
+    entity_plan = _route_entity_stats(text, civs)
+    if entity_plan:
+        return entity_plan
+
+    # "how to play <civ>" — the Vortix guide has everything needed
+    if len(civs) == 1 and _GUIDE_RE.search(text) and not _WINRATE_RE.search(text):
+        return [("search_pro_content", {"query": text, "channel": "Vortix"})]
+
+    return []
+
+
+def _route_leaderboard(text: str) -> tuple[str, dict] | None:
+    """ "leaderboard top 20 germany" / "2v2 ladder" -> get_leaderboard."""
+    if not _LEADERBOARD_RE.search(text):
+        return None
+    top = _TOP_N_RE.search(text)
+    if top and top.group(1) and int(top.group(1)) > LEADERBOARD_ROWS:
+        return None
+    if not _nothing_else(text, _LEADERBOARD_RE, _TOP_N_RE, _MODE_RE, _COUNTRY_RE):
+        return None
+    args: dict = {}
+    mode = _MODE_RE.search(text)
+    if mode:
+        args["mode"] = normalize_mode(mode.group(1))
+    country = _COUNTRY_RE.search(text)
+    if country:
+        args["country"] = COUNTRY_CODES[country.group(1).lower()]
+    if top and top.group(1) and int(top.group(1)) > 0:
+        args["count"] = int(top.group(1))
+    return "get_leaderboard", args
+
+
+def route_direct(text: str) -> tuple[str, dict] | None:
+    """Return the single deterministic tool call whose output fully answers text, or None."""
+    if not text or len(text) > MAX_ROUTABLE_CHARS:
+        return None
+
+    # "leaderboard top 20 france": before civ detection, "france"/"china"/"japan" are civ aliases
+    leaderboard = _route_leaderboard(text)
+    if leaderboard:
+        return leaderboard
+
+    civs = _detect_civs(text)
+
+    # "english vs french winrate"
+    if len(civs) == 2 and _VERSUS_RE.search(text) and _WINRATE_RE.search(text):
+        if _nothing_else(text, _CIV_WORD_RE, _VERSUS_RE, _WINRATE_RE, _MODE_RE):
+            args = {"civ1": civs[0], "civ2": civs[1]}
+            mode = _MODE_RE.search(text)
+            if mode:
+                args["mode"] = normalize_mode(mode.group(1))
+            return "get_matchup_stats", args
+        return None
+
+    # "knight stats" / "stats of the blacksmith" (already anchored to the whole message)
+    entity_plan = _route_entity_stats(text, civs)
+    if entity_plan:
+        return entity_plan[0]
+    return None
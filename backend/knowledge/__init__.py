@@ -16,6 +16,13 @@ DB_PATH = os.path.join(DB_DIR, "knowledge.db")
 
 _conn: sqlite3.Connection | None = None
 
+# Optional in-memory copy of every chunk, filled by preload(). When loaded in a
+# parent process before forking workers, the matrix is shared copy-on-write.
+_matrix: np.ndarray | None = None  # (n_chunks, dim) float32, rows L2-normalized
+_rows: list[dict] = []
+
+_COLUMNS = "id, document, embedding, source, channel, title, video_id, url, upload_date, language, timestamp_start, timestamp_end"
+
 
 def get_conn() -> sqlite3.Connection:
     global _conn
@@ -49,7 +56,72 @@ def _init_schema(conn: sqlite3.Connection):
     conn.commit()
 
 
+def _row_to_result(row, similarity: float) -> dict:
+    return {
+        "id": row["id"],
+        "document": row["document"],
+        "similarity": similarity,
+        "metadata": {
+            "source": row["source"],
+            "channel": row["channel"],
+            "title": row["title"],
+            "video_id": row["video_id"],
+            "url": row["url"],
+            "upload_date": row["upload_date"],
+            "language": row["language"],
+            "timestamp_start": row["timestamp_start"],
+            "timestamp_end": row["timestamp_end"],
+        },
+    }
+
+
+def preload() -> int:
+    """Load all chunks and a normalized embedding matrix into memory. Returns chunk count.
+
+    search() then runs a single matrix-vector product instead of reading and
+    decoding every embedding from SQLite per query.
+    """
+    global _matrix, _rows
+    rows = get_conn().execute(f"SELECT {_COLUMNS} FROM chunks").fetchall()
+    if not rows:
+        _matrix, _rows = None, []
+        return 0
+    matrix = np.vstack([np.frombuffer(r["embedding"], dtype=np.float32) for r in rows])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    _matrix = matrix / norms
+    # Drop the raw embedding blobs; metadata + document are all search() needs
+    _rows = [{k: r[k] for k in r.keys() if k != "embedding"} for r in rows]
+    return len(_rows)
+
+
+def _search_preloaded(
+    query_vec: np.ndarray,
+    n_results: int,
+    channel: str | None,
+    language: str | None,
+    video_id: str | None,
+) -> list[dict]:
+    similarities = _matrix @ (query_vec / np.linalg.norm(query_vec))
+    order = np.argsort(-similarities)
+    results = []
+    for i in order:
+        row = _rows[i]
+        if channel and row["channel"] != channel:
+            continue
+        if language and row["language"] != language:
+            continue
+        if video_id and row["video_id"] != video_id:
+            continue
+        results.append(_row_to_result(row, float(similarities[i])))
+        if len(results) >= n_results:
+            break
+    return results
+
+
 def count() -> int:
+    if _matrix is not None:
+        return len(_rows)
     conn = get_conn()
     row = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()
     return row[0] if row else 0
@@ -68,6 +140,8 @@ def upsert_chunks(
     metadatas: list[dict[str, Any]],
 ):
     """Insert or replace chunks with their embeddings and metadata."""
+    global _matrix, _rows
+    _matrix, _rows = None, []  # preloaded copy is stale now
     conn = get_conn()
     for chunk_id, doc, emb, meta in zip(ids, documents, embeddings, metadatas):
         emb_blob = np.array(emb, dtype=np.float32).tobytes()
@@ -101,10 +175,16 @@ def search(
     video_id: str | None = None,
 ) -> list[dict]:
     """Search for the most similar chunks using cosine similarity."""
+    query_vec = np.array(query_embedding, dtype=np.float32)
+    if not np.linalg.norm(query_vec):
+        return []
+    if _matrix is not None:
+        return _search_preloaded(query_vec, n_results, channel, language, video_id)
+
     conn = get_conn()
 
     # Build query with optional filters
-    sql = "SELECT id, document, embedding, source, channel, title, video_id, url, upload_date, language, timestamp_start, timestamp_end FROM chunks"
+    sql = f"SELECT {_COLUMNS} FROM chunks"
     conditions = []
     params: list[Any] = []
     if channel:
@@ -124,10 +204,7 @@ def search(
         return []
 
     # Compute cosine similarities
-    query_vec = np.array(query_embedding, dtype=np.float32)
     query_norm = np.linalg.norm(query_vec)
-    if query_norm == 0:
-        return []
 
     results = []
     for row in rows:
@@ -136,22 +213,7 @@ def search(
         if emb_norm == 0:
             continue
         similarity = float(np.dot(query_vec, emb) / (query_norm * emb_norm))
-        results.append({
-            "id": row["id"],
-            "document": row["document"],
-            "similarity": similarity,
-            "metadata": {
-                "source": row["source"],
-                "channel": row["channel"],
-                "title": row["title"],
-                "video_id": row["video_id"],
-                "url": row["url"],
-                "upload_date": row["upload_date"],
-                "language": row["language"],
-                "timestamp_start": row["timestamp_start"],
-                "timestamp_end": row["timestamp_end"],
-            },
-        })
+        results.append(_row_to_result(row, similarity))
 
     # Sort by similarity (highest first) and return top N
     results.sort(key=lambda x: x["similarity"], reverse=True)
@@ -160,6 +222,8 @@ def search(
 
 def reset():
     """Delete all chunks. Used during full re-ingestion."""
+    global _matrix, _rows
+    _matrix, _rows = None, []
     conn = get_conn()
     conn.execute("DELETE FROM chunks")
     conn.commit()
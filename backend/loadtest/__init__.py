@@ -0,0 +1 @@
+"""Offline load-test harness: fake OpenAI server, stub upstream APIs and an SSE driver."""
@@ -0,0 +1,178 @@
+"""Concurrent SSE client driver for /api/chat.
+
+Opens N concurrent streams (each worker sends requests back to back) and
+reports throughput, time to first token and latency percentiles per
+concurrency level.
+
+Usage (against an already running backend):
+    cd backend
+    python -m loadtest.driver --url http://127.0.0.1:8000 --concurrency 1,10,50
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import aiohttp
+
+# Mix of question shapes, roughly matching production traffic (see test_50.py)
+PROMPTS = [
+    "How to play French?",
+    "¿Cómo juego mongoles?",
+    "What is the current meta?",
+    "English vs French winrate",
+    "Knight stats",
+    "build order for french fast castle",
+    "leaderboard top players",
+    "Which civ is best on Dry Arabia map?",
+    "How do I counter knights as Rus?",
+    "Find player Beastyqt",
+    "What patch are we on?",
+]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def stream_one(session: aiohttp.ClientSession, url: str, prompt: str) -> dict:
+    """Send one chat request and time it. ttft = first token/message event."""
+    body = {"messages": [{"role": "user", "content": prompt}], "timing": True}
+    start = time.perf_counter()
+    ttft = None
+    events = 0
+    timing = None
+    error = None
+    try:
+        async with session.post(f"{url}/api/chat", json=body) as resp:
+            if resp.status != 200:
+                return {"ok": False, "error": f"HTTP {resp.status}", "latency": time.perf_counter() - start}
+            async for raw_line in resp.content:
+                line = raw_line.decode("utf-8", errors="replace").strip()
+                if not line.startswith("data:"):
+                    continue
+                events += 1
+                event = json.loads(line[5:].strip())
+                if event.get("type") in ("token", "message") and ttft is None:
+                    ttft = time.perf_counter() - start
+                elif event.get("type") == "timing":
+                    timing = event
+                elif event.get("type") == "error":
+                    error = event.get("content")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return {"ok": False, "error": str(e) or type(e).__name__, "latency": time.perf_counter() - start}
+    return {
+        "ok": error is None,
+        "error": error,
+        "ttft": ttft,
+        "latency": time.perf_counter() - start,
+        "events": events,
+        "timing": timing,
+    }
+
+
+async def run_level(url: str, concurrency: int, requests_per_worker: int = 2) -> dict:
+    """Run `concurrency` workers, each sending requests_per_worker requests sequentially."""
+    prompts = itertools.cycle(PROMPTS)
+    results: list[dict] = []
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=300)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async def worker():
+            for _ in range(requests_per_worker):
+                results.append(await stream_one(session, url, next(prompts)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    ok = [r for r in results if r["ok"]]
+    ttfts = [r["ttft"] for r in ok if r["ttft"] is not None]
+    latencies = [r["latency"] for r in ok]
+    errors: dict[str, int] = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(ok),
+        "throughput": len(ok) / wall if wall else 0.0,
+        "ttft_p50": _percentile(ttfts, 0.5),
+        "ttft_p99": _percentile(ttfts, 0.99),
+        "latency_p50": _percentile(latencies, 0.5),
+        "latency_p99": _percentile(latencies, 0.99),
+        "events_avg": sum(r["events"] for r in ok) / len(ok) if ok else 0.0,
+        "errors": errors,
+        "results": results,
+    }
+
+
+def print_report(levels: list[dict]):
+    print()
+    print(f"{'conc':>5} {'reqs':>5} {'ok':>5} {'req/s':>7} {'ttft p50':>9} {'ttft p99':>9} "
+          f"{'lat p50':>8} {'lat p99':>8} {'events':>7}")
+    for lv in levels:
+        print(
+            f"{lv['concurrency']:>5} {lv['requests']:>5} {lv['ok']:>5} {lv['throughput']:>7.1f} "
+            f"{lv['ttft_p50']:>8.2f}s {lv['ttft_p99']:>8.2f}s {lv['latency_p50']:>7.2f}s "
+            f"{lv['latency_p99']:>7.2f}s {lv['events_avg']:>7.0f}"
+        )
+        for error, count in lv["errors"].items():
+            print(f"      {count}x {error}")
+
+
+def print_phase_report(levels: list[dict]):
+    """Per model/phase OpenAI latency and tokens, from the backend's timing events."""
+    calls: dict[tuple[str, str], list[dict]] = {}
+    for lv in levels:
+        for r in lv["results"]:
+            for span in (r.get("timing") or {}).get("spans", []):
+                if span["name"] == "openai":
+                    calls.setdefault((span.get("phase", ""), span.get("model", "")), []).append(span)
+    if not calls:
+        return
+    print()
+    print(f"{'phase':>7} {'model':<16} {'calls':>6} {'ttft p50':>9} {'call p50':>9} {'prompt':>7} {'compl':>6}")
+    for (phase, model), spans in sorted(calls.items()):
+        ttfts = [s["ttft_ms"] / 1000 for s in spans if s.get("ttft_ms") is not None]
+        durations = [s["duration_ms"] / 1000 for s in spans]
+        prompt = sum(s.get("prompt_tokens", 0) for s in spans) / len(spans)
+        completion = sum(s.get("completion_tokens", 0) for s in spans) / len(spans)
+        print(
+            f"{phase:>7} {model:<16} {len(spans):>6} {_percentile(ttfts, 0.5):>8.2f}s "
+            f"{_percentile(durations, 0.5):>8.2f}s {prompt:>7.0f} {completion:>6.0f}"
+        )
+
+
+async def run_levels(url: str, levels: list[int], requests_per_worker: int) -> list[dict]:
+    results = []
+    for concurrency in levels:
+        print(f"[loadtest] {concurrency} concurrent streams...", flush=True)
+        results.append(await run_level(url, concurrency, requests_per_worker))
+    return results
+
+
+def parse_levels(text: str) -> list[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent SSE load driver for /api/chat")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", default="1,10,50,100", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=2, help="requests per worker per level")
+    args = parser.parse_args()
+    levels = asyncio.run(run_levels(args.url, parse_levels(args.concurrency), args.requests))
+    print_report(levels)
+    print_phase_report(levels)
+
+
+if __name__ == "__main__":
+    main()
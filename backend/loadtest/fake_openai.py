@@ -0,0 +1,193 @@
+"""Fake OpenAI-compatible server for load tests.
+
+Implements streaming /v1/chat/completions (text deltas, incremental tool-call
+deltas, include_usage) and /v1/embeddings. The first model iteration of a
+turn emits scripted tool calls picked by keywords in the last user message;
+once tool results are in the conversation it streams a canned answer.
+Latency is configurable: time to first chunk (optionally per model, to
+compare a small planner model against the answer model), then a delay per token.
+
+The backend uses it via OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+
+from aiohttp import web
+
+# Keyword in the last user message -> tool calls for the first iteration
+TOOL_SCRIPTS: list[tuple[str, list[tuple[str, dict]]]] = [
+    ("build order", [("search_build_orders", {"civ": "french"})]),
+    ("leaderboard", [("get_leaderboard", {"mode": "rm_solo"})]),
+    (" vs ", [("get_matchup_stats", {"civ1": "english", "civ2": "french"})]),
+    ("meta", [("get_civ_stats", {"mode": "rm_solo"}), ("get_map_stats", {"mode": "rm_solo"})]),
+    ("map", [("get_map_stats", {"mode": "rm_solo", "map_name": "Dry Arabia"})]),
+    ("stats", [("query_unit_stats", {"name": "knight"})]),
+    ("player", [("search_player", {"query": "Beastyqt"})]),
+    ("patch", [("get_patch_notes", {})]),
+]
+
+ANSWER_WORDS = (
+    "### Stats\n- **French** sit at **51.2%** win rate over **24,310** games. "
+    "Knights hit hard in Feudal, so keep **Spearmen** close and wall your gold. "
+).split(" ")
+
+EMBEDDING_DIM = 1536
+
+
+def _chunk(model: str, delta: dict, finish_reason: str | None = None) -> dict:
+    return {
+        "id": "chatcmpl-loadtest",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _pick_tool_calls(messages: list[dict]) -> list[tuple[str, dict]]:
+    """Scripted tool calls, only if this turn has no tool results yet."""
+    last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+    if last_user < 0 or any(m.get("role") == "tool" for m in messages[last_user + 1:]):
+        return []
+    text = (messages[last_user].get("content") or "").lower()
+    for keyword, calls in TOOL_SCRIPTS:
+        if keyword in text:
+            return calls
+    return []
+
+
+def create_app(
+    ttft: float = 0.4,
+    token_delay: float = 0.01,
+    answer_tokens: int = 200,
+    model_ttft: dict[str, float] | None = None,
+) -> web.Application:
+    """model_ttft overrides ttft for specific models, e.g. {"gpt-4.1-nano": 0.15}."""
+    model_ttft = model_ttft or {}
+    app = web.Application()
+    app["requests_by_model"] = {}
+    app["cancelled_streams"] = 0
+
+    async def send(resp: web.StreamResponse, payload: dict):
+        await resp.write(f"data: {json.dumps(payload)}\n\n".encode())
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        model = body.get("model", "")
+        app["requests_by_model"][model] = app["requests_by_model"].get(model, 0) + 1
+        messages = body.get("messages", [])
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        try:
+            await stream_completion(resp, model, messages, bool(body.get("tools")), include_usage)
+        except ConnectionResetError:
+            # The backend closed the stream early (its client disconnected)
+            app["cancelled_streams"] += 1
+        return resp
+
+    async def stream_completion(
+        resp: web.StreamResponse, model: str, messages: list[dict], has_tools: bool, include_usage: bool,
+    ):
+        await asyncio.sleep(model_ttft.get(model, ttft))
+
+        tool_calls = _pick_tool_calls(messages) if has_tools else []
+        completion_tokens = 0
+        if tool_calls:
+            for i, (name, args) in enumerate(tool_calls):
+                args_str = json.dumps(args)
+                half = len(args_str) // 2
+                # Arguments arrive in pieces, like the real API
+                await send(resp, _chunk(model, {"tool_calls": [{
+                    "index": i, "id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                    "function": {"name": name, "arguments": args_str[:half]},
+                }]}))
+                await asyncio.sleep(token_delay * 5)
+                await send(resp, _chunk(model, {"tool_calls": [{
+                    "index": i, "function": {"arguments": args_str[half:]},
+                }]}))
+                completion_tokens += 15
+            await send(resp, _chunk(model, {}, "tool_calls"))
+        else:
+            for n in range(answer_tokens):
+                word = ANSWER_WORDS[n % len(ANSWER_WORDS)]
+                await send(resp, _chunk(model, {"content": word + " "}))
+                if token_delay:
+                    await asyncio.sleep(token_delay)
+            completion_tokens = answer_tokens
+            await send(resp, _chunk(model, {}, "stop"))
+
+        if include_usage:
+            prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4
+            await send(resp, {
+                "id": "chatcmpl-loadtest", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model, "choices": [],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+
+    async def embeddings(request: web.Request) -> web.Response:
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return web.json_response({
+            "object": "list",
+            "model": body.get("model", ""),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": [0.01] * EMBEDDING_DIM}
+                for i in range(len(inputs))
+            ],
+            "usage": {"prompt_tokens": 8, "total_tokens": 8},
+        })
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response({**app["requests_by_model"], "cancelled_streams": app["cancelled_streams"]})
+
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/embeddings", embeddings)
+    app.router.add_get("/_stats", stats)
+    return app
+
+
+def parse_model_ttft(text: str) -> dict[str, float]:
+    """'model=seconds,model=seconds' -> dict."""
+    pairs = (item.split("=", 1) for item in text.split(",") if "=" in item)
+    return {model.strip(): float(seconds) for model, seconds in pairs}
+
+
+async def start(
+    host: str = "127.0.0.1", port: int = 0, **kwargs,
+) -> tuple[web.AppRunner, int]:
+    """Start the fake server in the running loop. Returns (runner, bound port)."""
+    runner = web.AppRunner(create_app(**kwargs), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, bound_port
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Fake OpenAI streaming server")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--ttft", type=float, default=0.4, help="seconds before the first chunk")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between tokens")
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    parser.add_argument("--model-ttft", default="", help="per-model ttft, e.g. gpt-4.1-nano=0.15")
+    args = parser.parse_args()
+    app = create_app(
+        ttft=args.ttft, token_delay=args.token_delay, answer_tokens=args.answer_tokens,
+        model_ttft=parse_model_ttft(args.model_ttft),
+    )
+    web.run_app(app, host="127.0.0.1", port=args.port, access_log=None)
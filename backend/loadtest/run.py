@@ -0,0 +1,138 @@
+"""
+Offline load test: fake OpenAI + stub upstreams + a real backend worker + SSE driver.
+
+Starts the fake servers in-process, launches the backend with uvicorn as a
+subprocess pointed at them (no network, no API key needed), then drives
+/api/chat at each concurrency level and prints throughput, TTFT and p99.
+
+Usage:
+    cd backend
+    python -m loadtest.run
+    python -m loadtest.run --concurrency 1,10,50,100,250,500 --ttft 0.6 --token-delay 0.02
+    python -m loadtest.run --workers 4
+    python -m loadtest.run --planner-model gpt-4.1-nano --model-ttft gpt-4.1-nano=0.15
+
+At high concurrency raise the open-file limit first (ulimit -n 4096).
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from loadtest import fake_openai, stub_upstreams
+from loadtest.driver import parse_levels, print_phase_report, print_report, run_levels
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def backend_env(
+    openai_port: int, stub_port: int, cache_dir: str, planner_model: str = "", warm: bool = False,
+) -> dict[str, str]:
+    stub = f"http://127.0.0.1:{stub_port}"
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "AOE4WORLD_BASE": f"{stub}/aoe4world/api/v0",
+        "AOE4DATA_BASE": f"{stub}/data",
+        "AOE4GUIDES_BASE": f"{stub}/aoe4guides",
+        "WIKI_BASE": f"{stub}/wiki/api.php",
+        "LIQUIPEDIA_BASE": f"{stub}/liquipedia/api.php",
+        "CHAT_RATE_LIMIT": "1000000/minute",
+        "GAME_DATA_CACHE_DIR": cache_dir,
+        "RESPONSE_CACHE_DB": "",
+        "UPSTREAM_CACHE_DB": os.path.join(cache_dir, "upstream_cache.db"),
+        "CACHE_WARM_ENABLED": "1" if warm else "0",
+        "CACHE_WARM_START_DELAY": "0",
+        "OPENAI_PLANNER_MODEL": planner_model,
+    })
+    return env
+
+
+async def wait_healthy(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/api/health") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.3)
+    raise RuntimeError(f"Backend at {url} did not become healthy")
+
+
+async def fetch_stats(url: str) -> dict:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{url}/_stats") as resp:
+            return await resp.json()
+
+
+async def run(args):
+    openai_runner, openai_port = await fake_openai.start(
+        ttft=args.ttft, token_delay=args.token_delay, answer_tokens=args.answer_tokens,
+        model_ttft=fake_openai.parse_model_ttft(args.model_ttft),
+    )
+    stub_runner, stub_port = await stub_upstreams.start(latency=args.upstream_latency)
+    backend_port = _free_port()
+    backend_url = f"http://127.0.0.1:{backend_port}"
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cmd = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(backend_port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ]
+        backend = await asyncio.create_subprocess_exec(
+            *cmd, cwd=BACKEND_DIR, env=backend_env(openai_port, stub_port, cache_dir, args.planner_model, args.warm),
+            stdout=None if args.verbose else asyncio.subprocess.DEVNULL,
+        )
+        try:
+            await wait_healthy(backend_url)
+            print(f"[loadtest] backend up at {backend_url} ({args.workers} worker(s))")
+            levels = await run_levels(backend_url, parse_levels(args.concurrency), args.requests)
+            print_report(levels)
+            print_phase_report(levels)
+            print(f"\n[loadtest] OpenAI calls by model: {await fetch_stats(f'http://127.0.0.1:{openai_port}')}")
+            print(f"[loadtest] upstream requests: {await fetch_stats(f'http://127.0.0.1:{stub_port}')}")
+        finally:
+            backend.terminate()
+            await backend.wait()
+            await openai_runner.cleanup()
+            await stub_runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for /api/chat")
+    parser.add_argument("--concurrency", default="1,10,50,100,250,500", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=2, help="requests per worker per level")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--ttft", type=float, default=0.4, help="fake OpenAI time to first chunk (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="fake OpenAI delay per token (s)")
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    parser.add_argument("--planner-model", default="", help="OPENAI_PLANNER_MODEL for the backend")
+    parser.add_argument("--model-ttft", default="", help="per-model ttft, e.g. gpt-4.1-nano=0.15")
+    parser.add_argument("--warm", action="store_true", help="enable the background cache warmer")
+    parser.add_argument("--upstream-latency", type=float, default=0.15, help="stub API latency (s)")
+    parser.add_argument("--verbose", action="store_true", help="show backend stdout (traces)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Local stand-ins for aoe4world, data.aoe4world, aoe4guides, Fandom and Liquipedia.
+
+Every route serves a recorded JSON fixture from loadtest/fixtures/ after a
+configurable delay, so tools run their real parsing/formatting code without
+touching the network. Point the backend at it with:
+
+    AOE4WORLD_BASE=http://127.0.0.1:<port>/aoe4world/api/v0
+    AOE4DATA_BASE=http://127.0.0.1:<port>/data
+    AOE4GUIDES_BASE=http://127.0.0.1:<port>/aoe4guides
+    WIKI_BASE=http://127.0.0.1:<port>/wiki/api.php
+    LIQUIPEDIA_BASE=http://127.0.0.1:<port>/liquipedia/api.php
+"""
+
+import asyncio
+import json
+import os
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Route -> fixture file. Order matters: specific routes before catch-alls.
+ROUTES: list[tuple[str, str]] = [
+    ("/aoe4world/api/v0/stats/analytics/ageups", "ageups.json"),
+    ("/aoe4world/api/v0/stats/{mode}/civilizations", "stats_civilizations.json"),
+    ("/aoe4world/api/v0/stats/{mode}/matchups", "stats_matchups.json"),
+    ("/aoe4world/api/v0/stats/{mode}/maps", "stats_maps.json"),
+    ("/aoe4world/api/v0/leaderboards/{mode}", "leaderboard.json"),
+    ("/aoe4world/api/v0/esports/leaderboards/{board}", "esports_leaderboard.json"),
+    ("/aoe4world/api/v0/players/search", "players_search.json"),
+    ("/aoe4world/api/v0/players/{profile_id}/games", "player_games.json"),
+    ("/aoe4world/api/v0/players/{profile_id}", "player_profile.json"),
+    ("/aoe4world/api/v0/games", "games.json"),
+    ("/aoe4guides/api/builds", "builds.json"),
+    ("/wiki/api.php", "mediawiki_search.json"),
+    ("/liquipedia/api.php", "mediawiki_search.json"),
+    ("/data/units/all.json", "units.json"),
+    ("/data/buildings/all.json", "buildings.json"),
+    ("/data/technologies/all.json", "technologies.json"),
+]
+
+
+def load_fixtures() -> dict[str, bytes]:
+    """Read every fixture once; responses are served from memory."""
+    fixtures = {}
+    for _, filename in ROUTES:
+        with open(os.path.join(FIXTURES_DIR, filename), "rb") as f:
+            fixtures[filename] = f.read()
+    return fixtures
+
+
+def create_app(latency: float = 0.15) -> web.Application:
+    """Build the stub app. latency is the simulated upstream response time in seconds."""
+    fixtures = load_fixtures()
+    app = web.Application()
+    app["requests"] = {}
+
+    def make_handler(filename: str):
+        async def handler(request: web.Request) -> web.Response:
+            app["requests"][filename] = app["requests"].get(filename, 0) + 1
+            if latency:
+                await asyncio.sleep(latency)
+            return web.Response(body=fixtures[filename], content_type="application/json")
+        return handler
+
+    for path, filename in ROUTES:
+        app.router.add_get(path, make_handler(filename))
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(app["requests"])
+
+    app.router.add_get("/_stats", stats)
+    return app
+
+
+async def start(host: str = "127.0.0.1", port: int = 0, latency: float = 0.15) -> tuple[web.AppRunner, int]:
+    """Start the stub server in the running loop. Returns (runner, bound port)."""
+    runner = web.AppRunner(create_app(latency), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, bound_port
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve recorded upstream API fixtures")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--latency", type=float, default=0.15, help="seconds per response")
+    args = parser.parse_args()
+    print(json.dumps({"stub_upstreams": f"http://127.0.0.1:{args.port}"}))
+    web.run_app(create_app(args.latency), host="127.0.0.1", port=args.port, access_log=None)
@@ -1,9 +1,12 @@
 """FastAPI application entry point."""
 
-import json
-from contextlib import asynccontextmanager
+import asyncio
+import gc
+import secrets
+from contextlib import aclosing, asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -11,20 +14,50 @@ from slowapi.errors import RateLimitExceeded
 from sse_starlette.sse import EventSourceResponse
 
 from models import ChatRequest
-from chat import chat_stream
+from chat import chat_stream, guide_cache, prewarm_guide_cache, PROMPT_ASSETS
+from config import (
+    PREWARM_GUIDES_ON_STARTUP, SSE_COALESCE_WINDOW, SSE_COALESCE_MAX_CHARS, CHAT_RATE_LIMIT,
+    SSE_SEND_BUFFER_EVENTS, SSE_DISCONNECT_POLL_INTERVAL, SSE_SEND_TIMEOUT, CACHE_SWEEP_INTERVAL,
+    UPSTREAM_CACHE_PRELOAD, CACHE_WARM_ENABLED, ADMIN_TOKEN, CACHE_STATS_TOP_KEYS,
+)
+from streaming import coalesce_tokens, encode_event, stream_to_client
 from data.loader import load_all
 from data import game_store
-from utils import close_session
+import metrics
+import cache_stats
+import cache_warmer
+from utils import close_session, circuit_states
+from cache import cache, preload_upstream
 
 limiter = Limiter(key_func=get_remote_address)
 
 
+def preload_shared_data():
+    """Load game data and KB embeddings in the master process before forking workers.
+
+    Called from gunicorn.conf.py (preload_app). Workers inherit the GameStore and
+    the embedding matrix copy-on-write; gc.freeze() keeps the collector from
+    touching (and thereby copying) those pages in every worker.
+    """
+    print("[preload] Loading game data...")
+    game_store.store = game_store.GameStore(asyncio.run(load_all()))
+    try:
+        import knowledge
+        print(f"[preload] Knowledge base: {knowledge.preload()} chunks in memory")
+        # Each worker opens its own SQLite connection after fork
+        knowledge.close()
+    except Exception as e:
+        print(f"[preload] Knowledge base unavailable: {e}")
+    gc.freeze()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: load game data
-    print("[startup] Loading game data...")
-    data = await load_all()
-    game_store.store = game_store.GameStore(data)
+    # Startup: load game data (already done when the master preloaded it)
+    if game_store.store is None:
+        print("[startup] Loading game data...")
+        data = await load_all()
+        game_store.store = game_store.GameStore(data)
 
     # Startup: initialize knowledge base
     print("[startup] Loading knowledge base...")
@@ -35,13 +68,41 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"[startup] Knowledge base unavailable: {e}")
 
+    # Startup: warm the memory cache with upstream payloads persisted on disk
+    if UPSTREAM_CACHE_PRELOAD:
+        print(f"[startup] Upstream cache: {preload_upstream()} payloads preloaded")
+
+    # Startup: restore persisted civ guide answers
+    restored = guide_cache.load()
+    print(f"[startup] Response cache: {restored} answers restored")
+
+    sweeper_task = asyncio.create_task(cache.run_sweeper(CACHE_SWEEP_INTERVAL))
+    warmer_task = asyncio.create_task(cache_warmer.run_warmer()) if CACHE_WARM_ENABLED else None
+    prewarm_task = None
+    if PREWARM_GUIDES_ON_STARTUP:
+        prewarm_task = asyncio.create_task(_prewarm_guides())
+
     print("[startup] Ready!")
     yield
-    # Shutdown: close HTTP session
+    # Shutdown: stop background tasks, close HTTP session and cache file
+    if prewarm_task and not prewarm_task.done():
+        prewarm_task.cancel()
+    sweeper_task.cancel()
+    if warmer_task:
+        warmer_task.cancel()
     await close_session()
+    guide_cache.close()
     print("[shutdown] Closed.")
 
 
+async def _prewarm_guides():
+    try:
+        generated = await prewarm_guide_cache()
+        print(f"[prewarm] Generated {generated} civ guide answers")
+    except Exception as e:
+        print(f"[prewarm] Failed: {e}")
+
+
 app = FastAPI(
     title="AoE4 RAGBot API",
     version="2.0.0",
@@ -82,17 +143,59 @@ async def health():
         "buildings": len(store.buildings) if store else 0,
         "technologies": len(store.technologies) if store else 0,
         "knowledge_base_chunks": kb_chunks,
+        "cached_guide_answers": len(guide_cache),
+        # Upstream circuit breakers: closed / open / half_open per host
+        "circuits": circuit_states(),
+        # Hot upstream payloads kept warm in the background
+        "cache_warmer": cache_warmer.status() if CACHE_WARM_ENABLED else None,
+        # Tool cache size and per-prefix hit/miss/eviction counters (this worker)
+        "tool_cache": cache.stats(),
+        # Changes whenever the system prompt or tool schemas change
+        "prompt_assets_hash": PROMPT_ASSETS.hash,
     }
 
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text format: per-stage and per-tool latency quantiles, token counts, cache contents."""
+    cache_stats.update_metrics()
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/cache/stats")
+async def cache_stats_endpoint(
+    top: int = CACHE_STATS_TOP_KEYS, x_admin_token: str | None = Header(default=None),
+):
+    """Per-prefix entries, memory, hit ratio, hottest keys and expiry spread of every cache (this worker)."""
+    if not ADMIN_TOKEN:
+        # Disabled unless a token is configured: top keys reveal what users asked for
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return cache_stats.report(top=max(0, min(top, 100)))
+
+
 @app.post("/api/chat")
-@limiter.limit("20/minute")
+@limiter.limit(CHAT_RATE_LIMIT)
 async def chat_endpoint(request: Request, chat_request: ChatRequest):
     async def event_generator():
-        async for chunk in chat_stream(chat_request):
-            yield json.dumps(chunk)
-
-    return EventSourceResponse(event_generator())
+        events = coalesce_tokens(
+            chat_stream(chat_request),
+            window=SSE_COALESCE_WINDOW,
+            max_chars=SSE_COALESCE_MAX_CHARS,
+        )
+        # Stop the turn (OpenAI stream + tools) when the browser goes away
+        buffered = stream_to_client(
+            events,
+            request.is_disconnected,
+            max_buffered=SSE_SEND_BUFFER_EVENTS,
+            poll_interval=SSE_DISCONNECT_POLL_INTERVAL,
+        )
+        async with aclosing(buffered):
+            async for chunk in buffered:
+                yield encode_event(chunk)
+
+    return EventSourceResponse(event_generator(), send_timeout=SSE_SEND_TIMEOUT)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""In-process metrics rendered in Prometheus text format for /api/metrics.
+
+Latencies are kept as summaries: a sliding window of recent samples per
+label set gives p50/p95/p99, plus cumulative _sum and _count.
+"""
+
+from collections import deque
+
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW_SIZE = 1024  # recent samples kept per label set
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _quantile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[idx]
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[tuple(sorted(labels.items()))] = value
+
+    def clear(self):
+        self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Summary:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._samples: dict[tuple, deque] = {}
+        self._sums: dict[tuple, float] = {}
+        self._counts: dict[tuple, int] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        if key not in self._samples:
+            self._samples[key] = deque(maxlen=WINDOW_SIZE)
+            self._sums[key] = 0.0
+            self._counts[key] = 0
+        self._samples[key].append(value)
+        self._sums[key] += value
+        self._counts[key] += 1
+
+    def quantiles(self, **labels) -> dict[float, float]:
+        key = tuple(sorted(labels.items()))
+        values = sorted(self._samples.get(key, ()))
+        return {q: _quantile(values, q) for q in QUANTILES}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} summary"]
+        for key in sorted(self._samples):
+            values = sorted(self._samples[key])
+            for q in QUANTILES:
+                lines.append(f"{self.name}{_format_labels(key, (('quantile', str(q)),))} {_quantile(values, q):.6f}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {self._sums[key]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {self._counts[key]}")
+        return lines
+
+
+_registry: list = []
+
+
+def counter(name: str, help_text: str) -> Counter:
+    metric = Counter(name, help_text)
+    _registry.append(metric)
+    return metric
+
+
+def gauge(name: str, help_text: str) -> Gauge:
+    metric = Gauge(name, help_text)
+    _registry.append(metric)
+    return metric
+
+
+def summary(name: str, help_text: str) -> Summary:
+    metric = Summary(name, help_text)
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    """Render every registered metric in Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Chat pipeline metrics ---
+TURN_SECONDS = summary("aoe4bot_turn_seconds", "Total time to answer a chat turn.")
+OPENAI_TTFT_SECONDS = summary("aoe4bot_openai_ttft_seconds", "Time to first streamed chunk per OpenAI call, by model and phase.")
+OPENAI_CALL_SECONDS = summary("aoe4bot_openai_call_seconds", "Total duration of each streamed OpenAI call, by model and phase.")
+OPENAI_TOKENS = counter("aoe4bot_openai_tokens_total", "OpenAI tokens used, by kind (prompt/completion), model and phase.")
+TOOL_SECONDS = summary("aoe4bot_tool_seconds", "Tool execution time, by tool and cache outcome.")
+TOOL_CALLS = counter("aoe4bot_tool_calls_total", "Tool executions, by tool and cache outcome.")
+CACHE_LOOKUP_SECONDS = summary("aoe4bot_cache_lookup_seconds", "Response cache lookup time, by cache and outcome.")
+CHAT_DISCONNECTS = counter(
+    "aoe4bot_chat_disconnects_total", "Chat turns cancelled mid-stream, by reason (client_disconnect/stream_closed).",
+)
+
+# --- Cache contents (set from the caches on each scrape, see cache_stats.update_metrics) ---
+CACHE_ENTRIES = gauge("aoe4bot_cache_entries", "Entries held in memory, by cache and key prefix.")
+CACHE_BYTES = gauge("aoe4bot_cache_bytes", "Approximate memory used by cached values, by cache and key prefix.")
+CACHE_HIT_RATIO = gauge("aoe4bot_cache_hit_ratio", "Lookup hit ratio since startup, by cache and key prefix.")
+CACHE_EXPIRING = gauge(
+    "aoe4bot_cache_expiring_entries", "Entries by time left before expiry, by cache, key prefix and bucket.",
+)
@@ -11,6 +11,16 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     messages: list[ChatMessage]
     stream: bool = True
+    # Client understands a single "message" event carrying a full cached answer
+    message_events: bool = False
+    # Send a final "timing" event with per-stage spans before "done"
+    timing: bool = False
+    # Send tool_start/tool_end progress events (duration, cache, rows) instead of tool_call
+    tool_events: bool = False
+    # With tool_events, also send table-style tool results as "tool_output" before the answer
+    tool_output: bool = False
+    # Client-generated id for the chat; enables tool-result memoization across turns
+    conversation_id: str | None = None
 
 
 class Source(BaseModel):
@@ -20,6 +30,17 @@ class Source(BaseModel):
 
 
 class ChatResponseChunk(BaseModel):
-    type: Literal["token", "sources", "done", "error", "tool_call"]
+    type: Literal[
+        "token", "message", "sources", "done", "error", "tool_call", "timing",
+        "tool_start", "tool_end", "tool_output",
+    ]
     content: str | None = None
     sources: list[Source] | None = None
+    # tool_start / tool_end / tool_output
+    id: str | None = None
+    tool: str | None = None
+    duration_ms: float | None = None
+    cache: str | None = None
+    ok: bool | None = None
+    cancelled: bool | None = None  # tool_end of a prefetched call whose result was dropped
+    rows: int | None = None
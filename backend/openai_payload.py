@@ -0,0 +1,63 @@
+"""Precompiled request bodies for streamed chat completions.
+
+The system prompt (~10 KB) and the 16 tool schemas never change at runtime,
+yet client.chat.completions.create() re-validates and re-serializes them on
+every iteration of every request. They are serialized once here and spliced
+into each body as bytes; only the conversation messages are encoded per
+call. The content hash versions the assets: it is reported by /api/health
+and prefixed to response-cache keys, so a prompt or schema edit invalidates
+cached answers.
+"""
+
+import hashlib
+import json
+
+from openai import AsyncOpenAI, AsyncStream
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the stdlib encoder
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class PromptAssets:
+    """System prompt + tool schemas, serialized once, with a content hash."""
+
+    def __init__(self, system_prompt: str, tools: list[dict]):
+        self.system_message = {"role": "system", "content": system_prompt}
+        self._system_json = _dumps(self.system_message)
+        self._tools_json = _dumps(tools)
+        self.hash = hashlib.sha256(self._system_json + b"\0" + self._tools_json).hexdigest()[:12]
+
+    def body(self, model: str, messages: list[dict], with_tools: bool = True) -> bytes:
+        """JSON body for a streamed completion; messages exclude the system prompt."""
+        parts = [
+            b'{"model":', _dumps(model),
+            b',"stream":true,"stream_options":{"include_usage":true},"messages":[',
+            self._system_json,
+        ]
+        for message in messages:
+            parts += (b",", _dumps(message))
+        parts.append(b"]")
+        if with_tools:
+            parts += (b',"tools":', self._tools_json)
+        parts.append(b"}")
+        return b"".join(parts)
+
+
+async def stream_completion(client: AsyncOpenAI, body: bytes) -> AsyncStream[ChatCompletionChunk]:
+    """POST a prebuilt body; same stream object as chat.completions.create(stream=True)."""
+    return await client.post(
+        "/chat/completions",
+        body=body,
+        cast_to=ChatCompletion,
+        stream=True,
+        stream_cls=AsyncStream[ChatCompletionChunk],
+    )
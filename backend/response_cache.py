@@ -0,0 +1,138 @@
+"""Bounded LRU + TTL cache for full chat responses, optionally persisted to SQLite.
+
+Used for civ guide answers: each entry is the coalesced answer text plus its
+sources (``{"text": ..., "sources": [...]}``), and a hit is replayed without
+calling OpenAI. Persistence lets the cache survive restarts and deploys, and lets a
+startup/cron job pre-warm the most common queries. A memory miss also checks
+the SQLite file, so a running server picks up answers written by the cron job
+or by other workers. The file is a cache.SQLiteStore: reads from the event
+loop run in a thread and writes are queued on its writer thread, so a busy
+file never blocks streaming, and a failing one only costs cache misses.
+"""
+
+import time
+from collections import OrderedDict
+
+from cache import SQLiteStore, approx_size, key_prefix
+
+
+class ResponseCache:
+    """In-memory LRU cache of coalesced answers with write-behind persistence."""
+
+    def __init__(self, max_entries: int = 256, ttl: int = 3600, db_path: str | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db = SQLiteStore(db_path) if db_path else None
+        self._store: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        # key prefix -> {"hits", "misses"}, and hits per cached key, for cache_stats
+        self._lookups: dict[str, dict[str, int]] = {}
+        self._hits: dict[str, int] = {}
+
+    # -- persistence -------------------------------------------------------
+
+    def load(self) -> int:
+        """Load unexpired entries from disk into memory (blocking, at startup). Returns the number loaded."""
+        if self.db is None:
+            return 0
+        self.db.cleanup()
+        rows = sorted(self.db.items(), key=lambda row: row[1], reverse=True)[:self.max_entries]
+        # Insert oldest first so the most recent entries end up most-recently-used
+        for key, expires_at, answer in reversed(rows):
+            self._store[key] = (expires_at - self.ttl, answer)
+        return len(rows)
+
+    def close(self):
+        """Flush queued writes and close the file."""
+        if self.db is not None:
+            self.db.close()
+
+    # -- cache API ---------------------------------------------------------
+
+    def _from_row(self, key: str, row: tuple[float, dict] | None) -> tuple[float, dict] | None:
+        if row is None:
+            return None
+        expires_at, answer = row
+        entry = (expires_at - self.ttl, answer)
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: tuple[float, dict]):
+        """Insert into memory as most recently used, evicting the oldest beyond max_entries.
+
+        Evicted answers stay on disk (other workers may be using them) until they expire.
+        """
+        self._store[key] = entry
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_entries:
+            evicted, _ = self._store.popitem(last=False)
+            self._hits.pop(evicted, None)
+
+    def get(self, key: str) -> dict | None:
+        """Blocking lookup (disk fallback read inline): for scripts, use aget() from the event loop."""
+        if key not in self._store and self.db is not None:
+            self._from_row(key, self.db.get(key))
+        return self._counted(key, self._fresh(key))
+
+    async def aget(self, key: str) -> dict | None:
+        """get() for the event loop: the SQLite fallback is read in a worker thread."""
+        if key not in self._store and self.db is not None:
+            row = await self.db.aget(key)  # None on any SQLite error: just a miss
+            if key not in self._store:
+                self._from_row(key, row)
+        return self._counted(key, self._fresh(key))
+
+    def _counted(self, key: str, answer: dict | None) -> dict | None:
+        lookups = self._lookups.setdefault(key_prefix(key), {"hits": 0, "misses": 0})
+        if answer is None:
+            lookups["misses"] += 1
+        else:
+            lookups["hits"] += 1
+            self._hits[key] = self._hits.get(key, 0) + 1
+        return answer
+
+    def _fresh(self, key: str) -> dict | None:
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        stored_at, answer = entry
+        if time.time() - stored_at >= self.ttl:
+            # Only the memory copy: the row may already have been rewritten by another
+            # worker, and expired rows are dropped by cleanup (expires_at <= now only)
+            self._store.pop(key, None)
+            self._hits.pop(key, None)
+            if self.db is not None:
+                self.db.cleanup_later()
+            return None
+        self._store.move_to_end(key)
+        return answer
+
+    def set(self, key: str, answer: dict):
+        stored_at = time.time()
+        self._remember(key, (stored_at, answer))
+        if self.db is not None:
+            self.db.set_later(key, answer, stored_at + self.ttl)
+
+    def invalidate(self, key: str):
+        self._store.pop(key, None)
+        self._hits.pop(key, None)
+        if self.db is not None:
+            self.db.delete_later(key)
+
+    def entry_info(self) -> list[tuple[str, int, int, float, None]]:
+        """(key, approx bytes, hits, expires_at, None) per entry, for cache_stats."""
+        return [
+            (key, approx_size(answer), self._hits.get(key, 0), stored_at + self.ttl, None)
+            for key, (stored_at, answer) in self._store.items()
+        ]
+
+    def lookup_counts(self) -> dict[str, dict[str, int]]:
+        return {prefix: dict(counts) for prefix, counts in self._lookups.items()}
+
+    def __contains__(self, key: str) -> bool:
+        # Not counted as a lookup: used to skip already cached answers when pre-warming
+        if key not in self._store and self.db is not None:
+            self._from_row(key, self.db.get(key))
+        return self._fresh(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._store)
@@ -0,0 +1,48 @@
+"""
+Pre-generate civ guide answers (22 civs x 2 languages) into the response cache.
+
+Answers already cached and unexpired are skipped, so this is cheap to run
+from cron after every deploy or once per cache TTL. A running server reads
+the new answers from RESPONSE_CACHE_DB on its next lookup of each guide.
+
+Usage:
+    cd backend
+    python -m scripts.prewarm_cache
+    python -m scripts.prewarm_cache --lang es
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from chat import guide_cache, prewarm_guide_cache
+from data import game_store
+from data.loader import load_all
+from utils import close_session
+
+
+async def run(langs: tuple[str, ...]):
+    game_store.store = game_store.GameStore(await load_all())
+    restored = guide_cache.load()
+    print(f"Response cache: {restored} answers already cached")
+    try:
+        generated = await prewarm_guide_cache(langs)
+    finally:
+        await close_session()
+        guide_cache.close()
+    print(f"Generated {generated} answers ({len(guide_cache)} cached in total)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the civ guide response cache")
+    parser.add_argument("--lang", choices=["en", "es"], help="Only pre-warm one language")
+    args = parser.parse_args()
+    langs = (args.lang,) if args.lang else ("en", "es")
+    asyncio.run(run(langs))
+
+
+if __name__ == "__main__":
+    main()
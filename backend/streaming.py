@@ -0,0 +1,156 @@
+"""SSE helpers for the /api/chat stream: token coalescing, fast event encoding
+and a bounded, disconnect-aware send buffer."""
+
+import asyncio
+import json
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable
+
+import metrics
+
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the stdlib encoder
+    orjson = None
+
+
+def encode_event(event: dict) -> str:
+    """Serialize an SSE event payload to compact JSON."""
+    if orjson is not None:
+        return orjson.dumps(event).decode()
+    return json.dumps(event, separators=(",", ":"))
+
+
+async def coalesce_tokens(
+    events: AsyncIterator[dict],
+    window: float = 0.03,
+    max_chars: int = 256,
+) -> AsyncGenerator[dict, None]:
+    """Merge consecutive "token" events into larger ones.
+
+    Tokens are buffered until the time window since the first buffered token
+    elapses, the buffer reaches max_chars, or a non-token event arrives (which
+    is emitted right after the flushed text, preserving order). This keeps the
+    stream looking smooth while cutting the number of SSE frames by ~10-20x.
+    """
+    loop = asyncio.get_running_loop()
+    source = events.__aiter__()
+    buffer: list[str] = []
+    size = 0
+    deadline = 0.0
+    pending: asyncio.Future | None = None
+
+    def flush() -> dict:
+        nonlocal buffer, size
+        event = {"type": "token", "content": "".join(buffer)}
+        buffer, size = [], 0
+        return event
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(source.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # Window elapsed with no new event: send what we have
+                yield flush()
+                continue
+
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                pending = None
+                break
+            pending = None
+
+            if event.get("type") == "token" and event.get("content"):
+                if not buffer:
+                    deadline = loop.time() + window
+                buffer.append(event["content"])
+                size += len(event["content"])
+                if size >= max_chars:
+                    yield flush()
+                continue
+
+            if buffer:
+                yield flush()
+            yield event
+
+        if buffer:
+            yield flush()
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            # Let the cancelled step unwind before closing the generator it is running
+            await asyncio.wait({pending})
+        aclose = getattr(source, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def stream_to_client(
+    events: AsyncGenerator[dict, None],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    max_buffered: int = 64,
+    poll_interval: float = 0.5,
+) -> AsyncGenerator[dict, None]:
+    """Run the event producer in its own task behind a bounded queue.
+
+    Once max_buffered events are waiting for a slow client the producer blocks,
+    which in turn stops reading the OpenAI stream, so memory per connection
+    stays bounded. A watcher polls is_disconnected() and cancels the producer
+    as soon as the client goes away; the cancellation propagates into
+    chat_stream, closing the OpenAI stream and cancelling running tools.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+
+    async def produce():
+        try:
+            async for event in events:
+                await queue.put(event)
+        finally:
+            await events.aclose()
+
+    producer = asyncio.create_task(produce())
+    getter: asyncio.Future | None = None
+
+    def abort(reason: str):
+        if not producer.done() and not producer.cancelling():
+            producer.cancel()
+            metrics.CHAT_DISCONNECTS.inc(reason=reason)
+
+    async def watch():
+        while not producer.done():
+            if await is_disconnected():
+                abort("client_disconnect")
+                return
+            await asyncio.sleep(poll_interval)
+
+    watcher = asyncio.create_task(watch())
+    try:
+        while True:
+            if not queue.empty():
+                yield queue.get_nowait()
+                continue
+            if producer.done():
+                break
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        if not producer.cancelled() and producer.exception():
+            raise producer.exception()
+    except asyncio.CancelledError:
+        # sse-starlette cancels the response task when it sees http.disconnect
+        abort("client_disconnect")
+        raise
+    finally:
+        watcher.cancel()
+        if getter is not None and not getter.done():
+            getter.cancel()
+        # Closed before the turn finished (send timeout, server shutdown, ...)
+        abort("stream_closed")
+        if not producer.done():
+            await asyncio.wait({producer})
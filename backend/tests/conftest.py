@@ -0,0 +1,11 @@
+"""Make the backend modules importable as top-level modules, like the app does.
+
+Run from the repo root or backend/: python -m pytest backend/tests
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,138 @@
+"""TTLCache: single-flight loads, stale-while-revalidate and negative caching."""
+
+import asyncio
+import time
+import traceback
+
+import pytest
+
+from cache import CacheEntry, TTLCache, stats_group
+from utils import UpstreamError
+
+RAW_KEY = "raw:https://aoe4world.com/api/v0/stats/rm_solo/civilizations"
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"calls": calls}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load(RAW_KEY, loader, ttl=60) for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert all(result == {"calls": 1} for result in results)
+    assert cache.stats()["by_prefix"]["raw:aoe4world/stats"]["coalesced"] == 9
+
+
+def test_cancelled_waiter_does_not_cancel_the_load():
+    cache = TTLCache()
+
+    async def loader():
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def main():
+        first = asyncio.create_task(cache.get_or_load("k:1", loader, ttl=60))
+        second = asyncio.create_task(cache.get_or_load("k:1", loader, ttl=60))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "value"
+    assert cache.get("k:1") == "value"
+
+
+def test_stale_value_served_while_one_refresh_runs():
+    cache = TTLCache()
+    cache.set_entry("k:1", CacheEntry("old", time.time() - 120, ttl=60, stale_ttl=600))
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "new"
+
+    async def main():
+        served = [await cache.get_or_load("k:1", loader, ttl=60, stale_ttl=600) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        return served, await cache.get_or_load("k:1", loader, ttl=60, stale_ttl=600)
+
+    served, refreshed = asyncio.run(main())
+    assert served == ["old", "old", "old"]
+    assert refreshed == "new"
+    assert calls == 1
+    assert cache.stats()["by_prefix"]["k"]["stale"] == 3
+
+
+def test_past_stale_window_is_a_miss():
+    cache = TTLCache()
+    cache.set_entry("k:1", CacheEntry("old", time.time() - 120, ttl=60, stale_ttl=30))
+
+    async def loader():
+        return "new"
+
+    assert asyncio.run(cache.get_or_load("k:1", loader, ttl=60, stale_ttl=30)) == "new"
+
+
+def test_failed_load_is_negatively_cached():
+    cache = TTLCache(negative_ttl=30)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        raise UpstreamError("upstream down")
+
+    async def main():
+        errors = []
+        for _ in range(3):
+            with pytest.raises(UpstreamError) as info:
+                await cache.get_or_load(RAW_KEY, loader, ttl=60)
+            errors.append(info.value)
+        return errors
+
+    errors = asyncio.run(main())
+    assert calls == 1
+    assert [str(error) for error in errors] == ["upstream down"] * 3
+    # Each negative hit raises its own instance, so tracebacks don't pile up
+    assert len({id(error) for error in errors}) == 3
+    depths = [len(traceback.extract_tb(error.__traceback__)) for error in errors[1:]]
+    assert depths[0] == depths[1]
+    assert cache.stats()["by_prefix"]["raw:aoe4world/stats"]["negative_hits"] == 2
+
+
+def test_failure_is_retried_after_negative_ttl():
+    cache = TTLCache(negative_ttl=0)
+    outcomes = iter([UpstreamError("down"), "ok"])
+
+    async def loader():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def main():
+        with pytest.raises(UpstreamError):
+            await cache.get_or_load(RAW_KEY, loader, ttl=60)
+        return await cache.get_or_load(RAW_KEY, loader, ttl=60)
+
+    assert asyncio.run(main()) == "ok"
+
+
+@pytest.mark.parametrize("key, group", [
+    ("raw:https://aoe4world.com/api/v0/stats/rm_solo/civilizations?patch=1", "raw:aoe4world/stats"),
+    ("raw:https://aoe4world.com/api/v0/players/123/games", "raw:aoe4world/players"),
+    ("raw:https://aoe4guides.com/api/builds?civ=ENG", "raw:aoe4guides/builds"),
+    ("raw:https://data.aoe4world.com/units/all.json", "raw:data.aoe4world/units"),
+    ("civ_stats:0123abcd", "civ_stats"),
+])
+def test_stats_group(key, group):
+    assert stats_group(key) == group
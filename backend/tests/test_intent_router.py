@@ -0,0 +1,53 @@
+"""Deterministic routing of obvious questions, after glossary expansion like chat.py does."""
+
+import pytest
+
+from data.glossary import expand_query
+from intent_router import route, route_direct
+
+
+@pytest.mark.parametrize("text, country", [
+    ("leaderboard top 20 france", "fr"),
+    ("leaderboard top 20 china", "cn"),
+    ("leaderboard top 20 japan", "jp"),
+])
+def test_country_leaderboard_named_like_a_civ(text, country):
+    assert route_direct(expand_query(text)) == ("get_leaderboard", {"country": country, "count": 20})
+
+
+def test_leaderboard_with_mode():
+    tool, args = route_direct(expand_query("2v2 ladder"))
+    assert tool == "get_leaderboard"
+    assert args["mode"] == "rm_2v2"
+
+
+@pytest.mark.parametrize("text", [
+    "fast castle build order for english",
+    "fc build order for english",
+])
+def test_build_strategy_survives_glossary_expansion(text):
+    assert route(expand_query(text)) == [
+        ("search_build_orders", {"civ": "english", "strategy": "fast castle"}),
+    ]
+
+
+def test_matchup_keeps_mode():
+    args = {"civ1": "holy_roman_empire", "civ2": "french", "mode": "rm_2v2"}
+    text = expand_query("hre vs french win rate 2v2")
+    assert route(text) == [("get_matchup_stats", args)]
+    assert route_direct(text) == ("get_matchup_stats", args)
+
+
+@pytest.mark.parametrize("text", [
+    "hre vs french win rate 1500 elo",
+    "hre vs french win rate conqueror",
+    "hre vs french win rate patch 12",
+])
+def test_matchup_with_qualifier_goes_to_the_model(text):
+    assert route(expand_query(text)) == []
+
+
+def test_unrelated_question_is_not_routed():
+    text = expand_query("what should I do against tower rushes in the early game?")
+    assert route(text) == []
+    assert route_direct(text) is None
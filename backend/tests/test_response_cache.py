@@ -0,0 +1,79 @@
+"""ResponseCache: SQLite persistence, and SQLite errors as misses off the event loop."""
+
+import asyncio
+import sqlite3
+import time
+
+from response_cache import ResponseCache
+
+ANSWER = {"text": "Play French aggressively.", "sources": [{"title": "guide"}]}
+
+
+def test_answer_is_persisted_and_loaded(tmp_path):
+    path = str(tmp_path / "responses.db")
+    writer = ResponseCache(db_path=path)
+    writer.set("abc:french:en", ANSWER)
+    writer.close()
+
+    reader = ResponseCache(db_path=path)
+    assert reader.load() == 1
+    assert reader.get("abc:french:en") == ANSWER
+    reader.close()
+
+
+def test_aget_reads_rows_written_by_another_worker(tmp_path):
+    path = str(tmp_path / "responses.db")
+    other = ResponseCache(db_path=path)
+    other.set("abc:french:en", ANSWER)
+    other.close()
+
+    cache = ResponseCache(db_path=path)
+    assert asyncio.run(cache.aget("abc:french:en")) == ANSWER
+    assert cache.lookup_counts()["abc"] == {"hits": 1, "misses": 0}
+    cache.close()
+
+
+def test_unreadable_file_is_a_miss(tmp_path):
+    # A directory where the database should be: every SQLite call fails
+    cache = ResponseCache(db_path=str(tmp_path))
+    assert asyncio.run(cache.aget("abc:french:en")) is None
+    cache.set("abc:french:en", ANSWER)
+    cache.invalidate("abc:french:en")
+    cache.close()
+    assert cache.lookup_counts()["abc"] == {"hits": 0, "misses": 1}
+
+
+def test_locked_file_does_not_block_the_loop(tmp_path):
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(db_path=path)
+    cache.set("abc:english:en", ANSWER)
+    cache.close()
+
+    lock = sqlite3.connect(path, isolation_level=None)
+    lock.execute("BEGIN EXCLUSIVE")
+    try:
+        async def main():
+            started = time.monotonic()
+            cache.set("abc:french:en", ANSWER)  # queued on the writer thread
+            cache.invalidate("abc:english:en")
+            return time.monotonic() - started
+
+        assert asyncio.run(main()) < 0.5
+        assert cache.get("abc:french:en") == ANSWER  # served from memory meanwhile
+    finally:
+        lock.execute("ROLLBACK")
+        lock.close()
+    cache.close()  # waits for the queued writes
+
+    reader = ResponseCache(db_path=path)
+    assert reader.load() == 1
+    assert reader.get("abc:french:en") == ANSWER
+    assert reader.get("abc:english:en") is None
+    reader.close()
+
+
+def test_expired_answer_is_a_miss(tmp_path):
+    cache = ResponseCache(ttl=0, db_path=str(tmp_path / "responses.db"))
+    cache.set("abc:french:en", ANSWER)
+    assert asyncio.run(cache.aget("abc:french:en")) is None
+    cache.close()
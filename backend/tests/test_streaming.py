@@ -0,0 +1,132 @@
+"""coalesce_tokens and stream_to_client, including client disconnects."""
+
+import asyncio
+
+from streaming import coalesce_tokens, stream_to_client
+
+
+async def _collect(events):
+    return [event async for event in events]
+
+
+async def _events(items, closed: list, delay: float = 0.0):
+    try:
+        for item in items:
+            if delay:
+                await asyncio.sleep(delay)
+            yield item
+    finally:
+        closed.append(True)
+
+
+def test_tokens_are_merged_and_order_is_kept():
+    closed = []
+    items = [
+        {"type": "token", "content": "Hel"},
+        {"type": "token", "content": "lo"},
+        {"type": "sources", "sources": []},
+        {"type": "token", "content": "!"},
+        {"type": "done"},
+    ]
+    result = asyncio.run(_collect(coalesce_tokens(_events(items, closed), window=1)))
+    assert result == [
+        {"type": "token", "content": "Hello"},
+        {"type": "sources", "sources": []},
+        {"type": "token", "content": "!"},
+        {"type": "done"},
+    ]
+    assert closed == [True]
+
+
+def test_buffer_flushes_at_max_chars():
+    items = [{"type": "token", "content": "abc"}] * 4
+    result = asyncio.run(_collect(coalesce_tokens(_events(items, []), window=1, max_chars=6)))
+    assert [event["content"] for event in result] == ["abcabc", "abcabc"]
+
+
+def test_closing_coalesced_stream_closes_source():
+    closed = []
+
+    async def main():
+        items = [{"type": "token", "content": "x"}] * 100
+        stream = coalesce_tokens(_events(items, closed, delay=0.01), window=0.02)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(main())["type"] == "token"
+    assert closed == [True]
+
+
+def test_stream_to_client_passes_events_through():
+    closed = []
+
+    async def connected():
+        return False
+
+    items = [{"type": "token", "content": str(i)} for i in range(10)] + [{"type": "done"}]
+    result = asyncio.run(_collect(stream_to_client(_events(items, closed), connected, max_buffered=2)))
+    assert result == items
+    assert closed == [True]
+
+
+def test_disconnect_cancels_producer():
+    closed = []
+    calls = 0
+
+    async def disconnected():
+        nonlocal calls
+        calls += 1
+        return calls > 1  # gone after the first poll
+
+    async def main():
+        items = [{"type": "token", "content": "x"}] * 1000
+        stream = stream_to_client(_events(items, closed, delay=0.01), disconnected, poll_interval=0.01)
+        return await asyncio.wait_for(_collect(stream), timeout=5)
+
+    result = asyncio.run(main())
+    assert len(result) < 1000
+    assert closed == [True]
+
+
+def test_cancelled_response_task_cancels_producer():
+    closed = []
+
+    async def connected():
+        return False
+
+    async def main():
+        items = [{"type": "token", "content": "x"}] * 1000
+        task = asyncio.create_task(_collect(stream_to_client(_events(items, closed, delay=0.01), connected)))
+        await asyncio.sleep(0.05)
+        task.cancel()  # what sse-starlette does on http.disconnect
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(main())
+    assert closed == [True]
+
+
+def test_producer_error_reaches_client():
+    async def failing():
+        yield {"type": "token", "content": "x"}
+        raise RuntimeError("boom")
+
+    async def connected():
+        return False
+
+    async def main():
+        received = []
+        try:
+            async for event in stream_to_client(failing(), connected):
+                received.append(event)
+        except RuntimeError as e:
+            return received, str(e)
+        return received, None
+
+    received, error = asyncio.run(main())
+    assert received == [{"type": "token", "content": "x"}]
+    assert error == "boom"
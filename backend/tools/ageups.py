@@ -2,25 +2,33 @@
 
 import asyncio
 import aiohttp
-from config import AOE4WORLD_BASE, CACHE_TTL_STATS, resolve_civ, CIV_DISPLAY_NAMES
+from config import AOE4WORLD_BASE, CACHE_TTL_STATS, CACHE_TTL_RENDER, resolve_civ, CIV_DISPLAY_NAMES
 from cache import cache
 from models import Source
+from utils import circuit, fetch_json_cached, UpstreamError
 
 
-async def _fetch_ageups(params: dict) -> dict | None:
+AGEUPS_URL = f"{AOE4WORLD_BASE}/stats/analytics/ageups"
+
+
+async def _fetch_ageups(url: str, params: dict) -> dict | None:
     """Fetch from the analytics endpoint with a browser-like User-Agent.
-    The ageups endpoint is internal and rate-limits bot User-Agents aggressively."""
-    url = f"{AOE4WORLD_BASE}/stats/analytics/ageups"
+    The ageups endpoint is internal and rate-limits bot User-Agents aggressively,
+    so it gets its own circuit breaker instead of sharing aoe4world's."""
+    breaker = circuit("aoe4world ageups")
+    breaker.check()
     try:
         async with aiohttp.ClientSession(
             headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"},
             timeout=aiohttp.ClientTimeout(total=15),
         ) as session:
             async with session.get(url, params=params) as resp:
+                breaker.record(resp.status)
                 if resp.status == 200:
                     return await resp.json()
                 return None
     except (aiohttp.ClientError, asyncio.TimeoutError):
+        breaker.record(None)
         return None
 
 
@@ -32,6 +40,7 @@ def _fmt_time(seconds: float | None) -> str:
     return f"{m}:{s:02d}"
 
 
+@cache.loader("ageups", ttl=CACHE_TTL_RENDER)
 async def get_ageup_stats(
     civilization: str | None = None,
     mode: str = "rm_solo",
@@ -48,14 +57,9 @@ async def get_ageup_stats(
     if rank_level:
         params["rank_level"] = rank_level
 
-    cache_key = f"ageups:{params}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
-    data = await _fetch_ageups(params)
+    data = await fetch_json_cached(AGEUPS_URL, params, CACHE_TTL_STATS, fetch=_fetch_ageups)
     if data is None:
-        return "Error: Could not fetch age-up analytics from aoe4world.com. The endpoint may be rate-limited — try again in a minute.", []
+        raise UpstreamError("Could not fetch age-up analytics from aoe4world.com (the endpoint may be rate-limited, try again in a minute)")
 
     # The key data is in the "age1-4" section (full landmark paths) or "age1-2", "age1-3"
     # Use the deepest available section for the most complete data
@@ -135,5 +139,4 @@ async def get_ageup_stats(
     source_url = "https://aoe4world.com/stats/analytics/ageups"
     sources = [Source(type="aoe4world", title=f"Age-up analytics: {civ_display}", url=source_url)]
 
-    cache.set(cache_key, (result, sources), CACHE_TTL_STATS)
     return result, sources
@@ -1,12 +1,13 @@
 """Tools for AoE4 World esports/tournament ELO leaderboard."""
 
 import json
-from config import AOE4WORLD_BASE, CACHE_TTL_STATS
+from config import AOE4WORLD_BASE, CACHE_TTL_STATS, CACHE_TTL_RENDER
 from cache import cache
-from utils import fetch_json, truncate
+from utils import fetch_json_cached, truncate, UpstreamError
 from models import Source
 
 
+@cache.loader("esports_lb", ttl=CACHE_TTL_RENDER)
 async def get_esports_leaderboard(
     page: int = 1,
     query: str | None = None,
@@ -16,15 +17,10 @@ async def get_esports_leaderboard(
     if query:
         params["query"] = query
 
-    cache_key = f"esports_lb:{page}:{query}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     url = f"{AOE4WORLD_BASE}/esports/leaderboards/1"
-    data = await fetch_json(url, params)
+    data = await fetch_json_cached(url, params, CACHE_TTL_STATS)
     if data is None:
-        return "Error: Could not fetch esports leaderboard from aoe4world.com.", []
+        raise UpstreamError("Could not fetch esports leaderboard from aoe4world.com")
 
     players = data.get("players", data) if isinstance(data, dict) else data
 
@@ -49,5 +45,4 @@ async def get_esports_leaderboard(
         title="Esports leaderboard",
         url="https://aoe4world.com/esports/leaderboards/1",
     )]
-    cache.set(cache_key, (result, sources), CACHE_TTL_STATS)
     return result, sources
@@ -1,31 +1,28 @@
 """Tools for AoE4 World leaderboard rankings."""
 
 import json
-from config import AOE4WORLD_BASE, CACHE_TTL_STATS
+from config import AOE4WORLD_BASE, CACHE_TTL_STATS, CACHE_TTL_RENDER
 from cache import cache
-from utils import fetch_json, truncate
+from utils import fetch_json_cached, truncate, UpstreamError
 from models import Source
 
 
+@cache.loader("leaderboard", ttl=CACHE_TTL_RENDER)
 async def get_leaderboard(
     mode: str = "rm_solo",
     page: int = 1,
     country: str | None = None,
+    count: int = 20,
 ) -> tuple[str, list[Source]]:
-    """Get the ranked leaderboard for a game mode."""
+    """Get the ranked leaderboard for a game mode (top `count` players of the page)."""
     params = {"page": page}
     if country:
         params["country"] = country.lower()
 
-    cache_key = f"leaderboard:{mode}:{page}:{country}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     url = f"{AOE4WORLD_BASE}/leaderboards/{mode}"
-    data = await fetch_json(url, params)
+    data = await fetch_json_cached(url, params, CACHE_TTL_STATS)
     if data is None:
-        return "Error: Could not fetch leaderboard from aoe4world.com.", []
+        raise UpstreamError("Could not fetch leaderboard from aoe4world.com")
 
     players = data.get("players", data) if isinstance(data, dict) else data
 
@@ -35,7 +32,7 @@ async def get_leaderboard(
     lines.append("|------|--------|--------|----------|-------|")
 
     if isinstance(players, list):
-        for p in players[:20]:
+        for p in players[:count]:
             rank = p.get("rank", "?")
             name = p.get("name", "Unknown")
             rating = p.get("rating", 0)
@@ -54,5 +51,4 @@ async def get_leaderboard(
         title=f"Leaderboard ({mode})",
         url=f"https://aoe4world.com/leaderboards/{mode}",
     )]
-    cache.set(cache_key, (result, sources), CACHE_TTL_STATS)
     return result, sources
@@ -1,25 +1,21 @@
 """Tool for fetching AoE4 patch notes and season information."""
 
-from config import AOE4WORLD_BASE, CACHE_TTL_WIKI
+from config import AOE4WORLD_BASE, CACHE_TTL_STATS, CACHE_TTL_WIKI, CACHE_TTL_RENDER
 from cache import cache
-from utils import fetch_json, truncate
+from utils import fetch_json_cached, truncate, UpstreamError
 from models import Source
 
 
+@cache.loader("patches", ttl=CACHE_TTL_RENDER)
 async def get_patch_notes(
     patch: str | None = None,
 ) -> tuple[str, list[Source]]:
     """Get current season info and recent patch changes."""
-    cache_key = f"patches:{patch or 'current'}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     sources = [Source(type="aoe4world", title="Patch information", url="https://aoe4world.com")]
 
     # Try the stats endpoint which includes patch metadata
     url = f"{AOE4WORLD_BASE}/stats/rm_solo/civilizations"
-    data = await fetch_json(url)
+    data = await fetch_json_cached(url, ttl=CACHE_TTL_STATS)  # same payload as get_civ_stats
 
     if data and isinstance(data, dict):
         patch_info = data.get("patch", data.get("patch_number", ""))
@@ -37,13 +33,11 @@ async def get_patch_notes(
             lines.append("")
             lines.append("For detailed patch notes, check the official Age of Empires website or the in-game news section.")
 
-            result = "\n".join(lines)
-            cache.set(cache_key, (result, sources), CACHE_TTL_WIKI)
-            return result, sources
+            return "\n".join(lines), sources
 
     # Fallback: try to get patch info from recent games
     url_games = f"{AOE4WORLD_BASE}/games"
-    games_data = await fetch_json(url_games, {"limit": 1})
+    games_data = await fetch_json_cached(url_games, {"limit": 1}, CACHE_TTL_WIKI)
 
     if games_data and isinstance(games_data, dict):
         games = games_data.get("games", [])
@@ -62,8 +56,6 @@ async def get_patch_notes(
             lines.append("")
             lines.append("For detailed patch notes with balance changes, check the official Age of Empires website.")
 
-            result = "\n".join(lines)
-            cache.set(cache_key, (result, sources), CACHE_TTL_WIKI)
-            return result, sources
+            return "\n".join(lines), sources
 
-    return "Could not retrieve patch information at this time.", sources
+    raise UpstreamError("Could not retrieve patch information at this time")
@@ -1,26 +1,24 @@
 """Tools for AoE4 World player search, profiles, and match history."""
 
 import json
-from config import AOE4WORLD_BASE, CACHE_TTL_PLAYERS
+from config import AOE4WORLD_BASE, CACHE_TTL_PLAYERS, CACHE_TTL_RENDER
 from cache import cache
-from utils import fetch_json, truncate
+from utils import fetch_json_cached, truncate, NotFound, UpstreamError
 from models import Source
 
+MATCHES_FETCH_LIMIT = 50  # aoe4world's maximum page size
 
+
+@cache.loader("player_search", ttl=CACHE_TTL_RENDER)
 async def search_player(query: str) -> tuple[str, list[Source]]:
     """Search for a player by name."""
     if len(query) < 3:
         return "Search query must be at least 3 characters.", []
 
-    cache_key = f"player_search:{query.lower()}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     url = f"{AOE4WORLD_BASE}/players/search"
-    data = await fetch_json(url, {"query": query})
+    data = await fetch_json_cached(url, {"query": query}, CACHE_TTL_PLAYERS)
     if data is None:
-        return "Error: Could not search players on aoe4world.com.", []
+        raise UpstreamError("Could not search players on aoe4world.com")
 
     players = data.get("players", data) if isinstance(data, dict) else data
     if not players:
@@ -53,21 +51,19 @@ async def search_player(query: str) -> tuple[str, list[Source]]:
         title=f"Player search: {query}",
         url=f"https://aoe4world.com/players/search?query={query}",
     )]
-    cache.set(cache_key, (result, sources), CACHE_TTL_PLAYERS)
     return result, sources
 
 
+@cache.loader("player_profile", ttl=CACHE_TTL_RENDER)
 async def get_player_profile(profile_id: str) -> tuple[str, list[Source]]:
     """Get detailed profile for a player."""
-    cache_key = f"player_profile:{profile_id}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     url = f"{AOE4WORLD_BASE}/players/{profile_id}"
-    data = await fetch_json(url)
+    try:
+        data = await fetch_json_cached(url, ttl=CACHE_TTL_PLAYERS)
+    except NotFound:
+        return f"No player found with profile_id {profile_id}.", []
     if data is None:
-        return f"Error: Could not fetch profile for player {profile_id}.", []
+        raise UpstreamError(f"Could not fetch profile for player {profile_id}")
 
     name = data.get("name", "Unknown")
     country = data.get("country", "")
@@ -105,7 +101,6 @@ async def get_player_profile(profile_id: str) -> tuple[str, list[Source]]:
         title=f"Player profile: {name}",
         url=f"https://aoe4world.com/players/{profile_id}",
     )]
-    cache.set(cache_key, (result, sources), CACHE_TTL_PLAYERS)
     return result, sources
 
 
@@ -115,14 +110,18 @@ async def get_player_matches(
     leaderboard: str | None = None,
 ) -> tuple[str, list[Source]]:
     """Get recent match history for a player."""
-    params = {"limit": min(count, 50)}
+    # Fetch the maximum once; every count renders from the same payload
+    params = {"limit": MATCHES_FETCH_LIMIT}
     if leaderboard:
         params["leaderboard"] = leaderboard
 
     url = f"{AOE4WORLD_BASE}/players/{profile_id}/games"
-    data = await fetch_json(url, params)
+    try:
+        data = await fetch_json_cached(url, params, CACHE_TTL_PLAYERS)
+    except NotFound:
+        return f"No player found with profile_id {profile_id}.", []
     if data is None:
-        return f"Error: Could not fetch matches for player {profile_id}.", []
+        raise UpstreamError(f"Could not fetch matches for player {profile_id}")
 
     games = data.get("games", data) if isinstance(data, dict) else data
     if not games:
@@ -133,7 +132,7 @@ async def get_player_matches(
     lines.append("|-----|-----|--------|--------|----------|")
 
     if isinstance(games, list):
-        for g in games[:count]:
+        for g in games[:min(count, MATCHES_FETCH_LIMIT)]:
             map_name = g.get("map", "Unknown")
             duration = g.get("duration")
             dur_str = f"{duration // 60}m" if duration else "N/A"
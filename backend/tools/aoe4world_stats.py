@@ -1,12 +1,13 @@
 """Tools for AoE4 World civilization statistics, matchups, and map data."""
 
 import json
-from config import AOE4WORLD_BASE, CACHE_TTL_STATS, resolve_civ, CIV_DISPLAY_NAMES
+from config import AOE4WORLD_BASE, CACHE_TTL_STATS, CACHE_TTL_RENDER, resolve_civ, CIV_DISPLAY_NAMES
 from cache import cache
-from utils import fetch_json, truncate
+from utils import fetch_json_cached, truncate, UpstreamError
 from models import Source
 
 
+@cache.loader("civ_stats", ttl=CACHE_TTL_RENDER)
 async def get_civ_stats(
     mode: str = "rm_solo",
     map: str | None = None,
@@ -30,15 +31,10 @@ async def get_civ_stats(
     elif rating_max:
         params["rating"] = f"<{rating_max}"
 
-    cache_key = f"civ_stats:{mode}:{json.dumps(params, sort_keys=True)}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     url = f"{AOE4WORLD_BASE}/stats/{mode}/civilizations"
-    data = await fetch_json(url, params)
+    data = await fetch_json_cached(url, params, CACHE_TTL_STATS)
     if data is None:
-        return "Error: Could not fetch civilization stats from aoe4world.com.", []
+        raise UpstreamError("Could not fetch civilization stats from aoe4world.com")
 
     # Format results
     civs = data if isinstance(data, list) else data.get("data", data.get("civilizations", []))
@@ -74,8 +70,6 @@ async def get_civ_stats(
     result = "\n".join(lines)
     source_url = f"https://aoe4world.com/stats/{mode}/civilizations"
     sources = [Source(type="aoe4world", title=f"Civ stats ({mode})", url=source_url)]
-
-    cache.set(cache_key, (result, sources), CACHE_TTL_STATS)
     return result, sources
 
 
@@ -97,9 +91,9 @@ async def get_matchup_stats(
         params["rank_level"] = rank_level
 
     url = f"{AOE4WORLD_BASE}/stats/{mode}/matchups"
-    data = await fetch_json(url, params)
+    data = await fetch_json_cached(url, params, CACHE_TTL_STATS)
     if data is None:
-        return "Error: Could not fetch matchup data from aoe4world.com.", []
+        raise UpstreamError("Could not fetch matchup data from aoe4world.com")
 
     # Resolve civ names
     c1 = resolve_civ(civ1)
@@ -195,16 +189,16 @@ async def get_map_stats(
     patch: str | None = None,
 ) -> tuple[str, list[Source]]:
     """Get map statistics and which civs perform best on each map."""
-    params = {}
+    # Always include per-civ breakdowns: the overview and every single-map
+    # view then render from one cached payload
+    params = {"include_civs": "true"}
     if patch:
         params["patch"] = patch
-    if map_name:
-        params["include_civs"] = "true"
 
     url = f"{AOE4WORLD_BASE}/stats/{mode}/maps"
-    data = await fetch_json(url, params)
+    data = await fetch_json_cached(url, params, CACHE_TTL_STATS)
     if data is None:
-        return "Error: Could not fetch map data from aoe4world.com.", []
+        raise UpstreamError("Could not fetch map data from aoe4world.com")
 
     maps = data if isinstance(data, list) else data.get("data", data.get("maps", []))
 
@@ -1,9 +1,9 @@
 """Tools for searching build orders from aoe4guides.com."""
 
 import re
-from config import AOE4GUIDES_BASE, CACHE_TTL_BUILDS, resolve_civ, GUIDES_CIV_MAP
+from config import AOE4GUIDES_BASE, CACHE_TTL_BUILDS, CACHE_TTL_RENDER, resolve_civ, GUIDES_CIV_MAP
 from cache import cache
-from utils import fetch_json, truncate
+from utils import fetch_json_cached, truncate, UpstreamError
 from models import Source
 
 # Minimum scoreAllTime to consider a build worth showing
@@ -50,6 +50,7 @@ def _clean_step_html(text: str) -> str:
     return text.strip()
 
 
+@cache.loader("builds", ttl=CACHE_TTL_RENDER)
 async def search_build_orders(
     civ: str = "ANY",
     strategy: str | None = None,
@@ -60,18 +61,13 @@ async def search_build_orders(
     canonical = resolve_civ(civ)
     guides_code = GUIDES_CIV_MAP.get(canonical, civ.upper()) if canonical else civ.upper()
 
-    cache_key = f"builds:{guides_code}:{strategy}:{count}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     # Fetch top-rated builds (orderBy=scoreAllTime is critical for quality)
     url = f"{AOE4GUIDES_BASE}/api/builds"
     params = {"civ": guides_code, "orderBy": "scoreAllTime"}
 
-    data = await fetch_json(url, params)
+    data = await fetch_json_cached(url, params, CACHE_TTL_BUILDS)
     if data is None:
-        return "Error: Could not fetch build orders from aoe4guides.com.", []
+        raise UpstreamError("Could not fetch build orders from aoe4guides.com")
 
     builds = data if isinstance(data, list) else data.get("builds", data.get("data", []))
     if not builds:
@@ -213,5 +209,4 @@ async def search_build_orders(
             url=f"{AOE4GUIDES_BASE}/builds/{builds[0].get('id', '')}" if builds and builds[0].get("id") else AOE4GUIDES_BASE,
         )
     ]
-    cache.set(cache_key, (result, sources), CACHE_TTL_BUILDS)
     return result, sources
@@ -123,6 +123,7 @@ TOOL_DEFINITIONS = [
                     },
                     "page": {"type": "integer", "description": "Page number (default 1)"},
                     "country": {"type": "string", "description": "Filter by country code (e.g. 'de', 'kr', 'es')"},
+                    "count": {"type": "integer", "description": "Players to show, up to 20 (default 20)"},
                 },
                 "required": ["mode"],
             },
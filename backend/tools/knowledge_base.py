@@ -98,6 +98,16 @@ def _detect_civ(query: str) -> str | None:
     return None
 
 
+def _detect_civs(query: str) -> list[str]:
+    """Detect all distinct civilizations mentioned in query, in order of appearance."""
+    civs: list[str] = []
+    for m in _CIV_PATTERN.finditer(query.lower()):
+        civ_id = CIV_ALIASES.get(m.group(1).lower())
+        if civ_id and civ_id not in civs:
+            civs.append(civ_id)
+    return civs
+
+
 def _load_guide(civ_id: str) -> str | None:
     """Load a civ's full guide markdown from disk. Returns None if not found."""
     path = os.path.join(GUIDES_DIR, f"{civ_id}.md")
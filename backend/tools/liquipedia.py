@@ -1,20 +1,16 @@
 """Tools for searching Liquipedia esports wiki (rate-limited)."""
 
-from config import CACHE_TTL_LIQUIPEDIA
+from config import CACHE_TTL_LIQUIPEDIA, LIQUIPEDIA_BASE, CACHE_TTL_RENDER
 from cache import cache
-from utils import fetch_json_liquipedia, truncate
+from utils import fetch_json_cached, fetch_json_liquipedia, truncate, UpstreamError
 from models import Source
 
 import re
 
 
+@cache.loader("liquipedia_search", ttl=CACHE_TTL_RENDER)
 async def search_liquipedia(query: str) -> tuple[str, list[Source]]:
     """Search Liquipedia for AoE4 esports information."""
-    cache_key = f"liquipedia_search:{query.lower()}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     params = {
         "action": "query",
         "list": "search",
@@ -22,9 +18,11 @@ async def search_liquipedia(query: str) -> tuple[str, list[Source]]:
         "srlimit": 5,
         "format": "json",
     }
-    data = await fetch_json_liquipedia(params)
+    data = await fetch_json_cached(
+        LIQUIPEDIA_BASE, params, CACHE_TTL_LIQUIPEDIA, fetch=lambda _url, p: fetch_json_liquipedia(p),
+    )
     if data is None:
-        return "Error: Could not search Liquipedia (rate limited or unavailable).", []
+        raise UpstreamError("Could not search Liquipedia (rate limited or unavailable)")
 
     results = data.get("query", {}).get("search", [])
     if not results:
@@ -46,5 +44,4 @@ async def search_liquipedia(query: str) -> tuple[str, list[Source]]:
         title=f"Liquipedia: {query}",
         url=f"https://liquipedia.net/ageofempires/index.php?search={query}",
     )]
-    cache.set(cache_key, (result, sources), CACHE_TTL_LIQUIPEDIA)
     return result, sources
@@ -0,0 +1,75 @@
+"""Canonical tool arguments, applied by the dispatcher before a tool runs.
+
+The model phrases the same request many ways (civ="French" / "fre" /
+"franceses", map "Dry Arabia" / "dry_arabia", mode "1v1" / "rm_solo").
+Normalizing here means every tool sees one spelling, so the cache keys
+(cache.cache_key, used by the tool cache and the conversation memo) line up
+across phrasings.
+"""
+
+import inspect
+
+from config import resolve_civ
+
+MODES = {"rm_solo", "rm_2v2", "rm_3v3", "rm_4v4", "qm_1v1", "qm_2v2", "qm_3v3", "qm_4v4"}
+MODE_ALIASES = {
+    "1v1": "rm_solo", "rm_1v1": "rm_solo", "ranked": "rm_solo", "ranked_1v1": "rm_solo", "solo": "rm_solo",
+    "2v2": "rm_2v2", "3v3": "rm_3v3", "4v4": "rm_4v4",
+    "ranked_2v2": "rm_2v2", "ranked_3v3": "rm_3v3", "ranked_4v4": "rm_4v4",
+    "qm": "qm_1v1", "quick_match": "qm_1v1", "quickmatch": "qm_1v1", "qm_solo": "qm_1v1",
+}
+
+# Argument name -> kind of value it holds
+_CIV_ARGS = {"civ", "civ1", "civ2", "civilization"}
+_MODE_ARGS = {"mode", "leaderboard"}
+_LOWERCASE_ARGS = {"name", "unit1", "unit2", "rank_level", "country", "strategy"}
+
+
+def _snake(value: str) -> str:
+    return "_".join(value.lower().replace("-", " ").replace("_", " ").split())
+
+
+def normalize_mode(value: str) -> str:
+    mode = _snake(value)
+    return mode if mode in MODES else MODE_ALIASES.get(mode, mode)
+
+
+def normalize_value(name: str, value):
+    if not isinstance(value, str):
+        return value
+    value = " ".join(value.split())
+    if name in _CIV_ARGS:
+        return resolve_civ(value) or value
+    if name in _MODE_ARGS:
+        return normalize_mode(value)
+    if name == "map":
+        # aoe4world map filter ids: 'dry_arabia'
+        return _snake(value)
+    if name == "map_name":
+        # matched as a substring of display names: 'dry arabia'
+        return _snake(value).replace("_", " ")
+    if name in _LOWERCASE_ARGS:
+        return value.lower()
+    return value
+
+
+def normalize_args(tool_fn, args: dict) -> dict:
+    """Canonicalize a tool call's arguments against the tool's signature.
+
+    Unknown parameters and values equal to the parameter's default are dropped
+    (so "mode": "rm_solo" and no mode are the same call), numeric strings are
+    coerced for int parameters and known value kinds are normalized.
+    """
+    params = inspect.signature(tool_fn).parameters
+    canonical = {}
+    for name, value in args.items():
+        param = params.get(name)
+        if param is None or value is None or value == "":
+            continue
+        if param.annotation in (int, int | None) and isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        value = normalize_value(name, value)
+        if param.default is not inspect.Parameter.empty and value == param.default:
+            continue
+        canonical[name] = value
+    return canonical
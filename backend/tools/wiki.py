@@ -1,19 +1,15 @@
 """Tools for searching the AoE Fandom wiki."""
 
 import json
-from config import WIKI_BASE, CACHE_TTL_WIKI
+from config import WIKI_BASE, CACHE_TTL_WIKI, CACHE_TTL_RENDER
 from cache import cache
-from utils import fetch_json, clean_wikitext, truncate
+from utils import fetch_json_cached, clean_wikitext, truncate, UpstreamError
 from models import Source
 
 
+@cache.loader("wiki_search", ttl=CACHE_TTL_RENDER)
 async def search_wiki(query: str) -> tuple[str, list[Source]]:
     """Search the Age of Empires Fandom wiki."""
-    cache_key = f"wiki_search:{query.lower()}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     params = {
         "action": "query",
         "list": "search",
@@ -21,9 +17,9 @@ async def search_wiki(query: str) -> tuple[str, list[Source]]:
         "srlimit": 5,
         "format": "json",
     }
-    data = await fetch_json(WIKI_BASE, params)
+    data = await fetch_json_cached(WIKI_BASE, params, CACHE_TTL_WIKI)
     if data is None:
-        return "Error: Could not search the AoE wiki.", []
+        raise UpstreamError("Could not search the AoE wiki")
 
     results = data.get("query", {}).get("search", [])
     if not results:
@@ -47,26 +43,21 @@ async def search_wiki(query: str) -> tuple[str, list[Source]]:
         title=f"Wiki search: {query}",
         url=f"https://ageofempires.fandom.com/wiki/Special:Search?query={query}",
     )]
-    cache.set(cache_key, (result, sources), CACHE_TTL_WIKI)
     return result, sources
 
 
+@cache.loader("wiki_page", ttl=CACHE_TTL_RENDER)
 async def get_wiki_page(title: str) -> tuple[str, list[Source]]:
     """Get the content of a specific wiki page."""
-    cache_key = f"wiki_page:{title.lower()}"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
-
     params = {
         "action": "parse",
         "page": title,
         "prop": "wikitext",
         "format": "json",
     }
-    data = await fetch_json(WIKI_BASE, params)
+    data = await fetch_json_cached(WIKI_BASE, params, CACHE_TTL_WIKI)
     if data is None:
-        return f"Error: Could not fetch wiki page '{title}'.", []
+        raise UpstreamError(f"Could not fetch wiki page '{title}'")
 
     parse = data.get("parse", {})
     if not parse:
@@ -89,5 +80,4 @@ async def get_wiki_page(title: str) -> tuple[str, list[Source]]:
         title=title,
         url=url,
     )]
-    cache.set(cache_key, (result, sources), CACHE_TTL_WIKI)
     return result, sources
@@ -0,0 +1,79 @@
+"""Per-turn tracing for chat_stream: spans for OpenAI calls, tools and cache lookups.
+
+Each finished turn is logged as one structured JSON line (``[trace] {...}``),
+every span is also fed into the in-process metrics, and the span summary can
+be sent to the client as a final "timing" SSE event.
+"""
+
+import json
+import time
+import uuid
+from contextlib import contextmanager
+
+import metrics
+
+
+class Trace:
+    """Collects timed spans for a single chat turn."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.spans: list[dict] = []
+        self.cancelled = False  # set when the client disconnected mid-turn
+        self._finished = False
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def add(self, name: str, start: float, **attrs) -> dict:
+        """Record a span that started at perf_counter() value start and ends now."""
+        span = {
+            "name": name,
+            "start_ms": round((start - self.started) * 1000, 1),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            **attrs,
+        }
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a block; attributes can be added to the yielded dict inside it."""
+        start = time.perf_counter()
+        extra: dict = dict(attrs)
+        try:
+            yield extra
+        finally:
+            self.add(name, start, **extra)
+
+    def summary(self) -> dict:
+        summary = {"trace_id": self.trace_id, "total_ms": round(self.elapsed_ms(), 1), "spans": self.spans}
+        if self.cancelled:
+            summary["cancelled"] = True
+        return summary
+
+    def finish(self):
+        """Log the trace and record per-stage metrics. Safe to call more than once."""
+        if self._finished:
+            return
+        self._finished = True
+        metrics.TURN_SECONDS.observe(self.elapsed_ms() / 1000)
+        for span in self.spans:
+            seconds = span["duration_ms"] / 1000
+            if span["name"] == "openai":
+                labels = {"model": span.get("model", ""), "phase": span.get("phase", "")}
+                metrics.OPENAI_CALL_SECONDS.observe(seconds, **labels)
+                if span.get("ttft_ms") is not None:
+                    metrics.OPENAI_TTFT_SECONDS.observe(span["ttft_ms"] / 1000, **labels)
+                metrics.OPENAI_TOKENS.inc(span.get("prompt_tokens", 0), kind="prompt", **labels)
+                metrics.OPENAI_TOKENS.inc(span.get("completion_tokens", 0), kind="completion", **labels)
+            elif span["name"] == "tool":
+                labels = {"tool": span.get("tool", ""), "cache": span.get("cache", "none")}
+                metrics.TOOL_SECONDS.observe(seconds, **labels)
+                metrics.TOOL_CALLS.inc(**labels)
+            elif span["name"] == "cache":
+                metrics.CACHE_LOOKUP_SECONDS.observe(
+                    seconds, cache=span.get("cache", ""), outcome="hit" if span.get("hit") else "miss",
+                )
+        print(f"[trace] {json.dumps(self.summary(), ensure_ascii=False, default=str)}")
@@ -1,7 +1,13 @@
 import asyncio
 import re
+import time
+from urllib.parse import urlencode, urlparse
+
 import aiohttp
 
+from cache import CacheEntry, cache, upstream_store
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+
 _session: aiohttp.ClientSession | None = None
 _liquipedia_lock = asyncio.Lock()
 _liquipedia_last_call = 0.0
@@ -9,6 +15,86 @@ _liquipedia_last_call = 0.0
 USER_AGENT = "AoE4RAGBot/1.0 (contact: github.com/aoe4ragbot)"
 
 
+class UpstreamError(Exception):
+    """An external API could not be reached or returned an error; never cached."""
+
+
+class SourceUnavailable(UpstreamError):
+    """Raised without a request while a host's circuit breaker is open."""
+
+
+class NotFound(UpstreamError):
+    """The upstream answered 404. Unlike other errors this outcome is cached."""
+
+
+class _NotFoundPayload:
+    """Stored in the payload caches in place of JSON when the upstream answered 404."""
+
+
+class CircuitBreaker:
+    """Per-host breaker: closed -> open after repeated failures -> half-open probe.
+
+    While open, calls fail immediately instead of waiting out the 15 s
+    timeout. After reset_timeout one probe request is let through (half-open);
+    success closes the circuit, failure reopens it for another reset_timeout.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def check(self):
+        """Raise SourceUnavailable unless a request may go out now."""
+        if self.state == "closed":
+            return
+        retry_in = self.reset_timeout - (time.monotonic() - self.opened_at)
+        if retry_in > 0:
+            raise SourceUnavailable(f"Source unavailable: {self.name} is not responding (retry in {retry_in:.0f}s)")
+        # Let one probe through; a probe that never reports back allows another after reset_timeout
+        self.state = "half_open"
+        self.opened_at = time.monotonic()
+
+    def record(self, status: int | None):
+        """Report a response status, or None for a connection error/timeout."""
+        if status is not None and status != 429 and status < 500:
+            if self.state != "closed":
+                print(f"[circuit] {self.name} closed")
+            self.state = "closed"
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"[circuit] {self.name} open after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        info = {"state": self.state, "failures": self.failures}
+        if self.state != "closed":
+            info["retry_in"] = max(0, round(self.reset_timeout - (time.monotonic() - self.opened_at)))
+        return info
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def circuit(name: str) -> CircuitBreaker:
+    """The breaker for a host (or another upstream name), created on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+    return breaker
+
+
+def circuit_states() -> dict[str, dict]:
+    return {name: breaker.snapshot() for name, breaker in sorted(_breakers.items())}
+
+
 async def get_session() -> aiohttp.ClientSession:
     global _session
     if _session is None or _session.closed:
@@ -26,23 +112,107 @@ async def close_session():
         _session = None
 
 
-async def fetch_json(url: str, params: dict | None = None) -> dict | list | None:
-    """Fetch JSON from a URL. Returns None on error."""
+async def fetch_json(url: str, params: dict | None = None, not_found=None) -> dict | list | None:
+    """Fetch JSON from a URL. Returns None on error, not_found on a 404.
+
+    Raises SourceUnavailable without a request while the host's circuit is open.
+    """
+    breaker = circuit(urlparse(url).netloc)
+    breaker.check()
     session = await get_session()
     try:
         async with session.get(url, params=params) as resp:
+            breaker.record(resp.status)
             if resp.status == 200:
                 return await resp.json()
-            return None
+            return not_found if resp.status == 404 else None
     except (aiohttp.ClientError, asyncio.TimeoutError):
+        breaker.record(None)
         return None
 
 
+def upstream_key(url: str, params: dict | None = None) -> str:
+    """Cache key for a raw upstream response: 'raw:' + URL with sorted query params."""
+    query = urlencode(sorted((params or {}).items()))
+    return f"raw:{url}?{query}" if query else f"raw:{url}"
+
+
+def _payload_loader(key: str, url: str, params: dict | None, ttl: int, fetch=None, use_disk: bool = True):
+    """Loader for one upstream payload: the disk copy if it isn't about to expire, else the network."""
+
+    async def load():
+        if use_disk and upstream_store is not None:
+            stored = await upstream_store.aget(key)
+            # A disk copy inside the refresh-ahead window would just be reloaded again
+            fresh_enough = stored is not None and stored[0] - time.time() > ttl * cache.refresh_ahead
+            if fresh_enough and isinstance(stored[1], CacheEntry):  # older rows held the bare payload
+                return stored[1]
+        if fetch is None:
+            data = await fetch_json(url, params, not_found=_NotFoundPayload())
+        else:
+            data = await fetch(url, params)
+        if data is None:
+            raise UpstreamError(f"Request to {url} failed")
+        # Persisted as the entry itself, so a copy read back keeps its age, TTL and stale window
+        entry = CacheEntry(data, time.time(), ttl, ttl)
+        if upstream_store is not None:
+            upstream_store.set_later(key, entry, entry.expires_at)
+        return entry
+
+    return load
+
+
+async def fetch_json_cached(url: str, params: dict | None = None, ttl: int = 3600, fetch=None):
+    """fetch_json through the payload caches: memory, then disk (L2), then the network.
+
+    Payloads are cached by URL + params for ttl seconds, in memory and in the
+    upstream SQLite file, so they survive restarts. For another ttl after
+    expiry the old payload is served while one background fetch refreshes it.
+    fetch(url, params) replaces fetch_json for hosts with their own client
+    (Liquipedia rate limit, ageups UA). Returns None on error, like fetch_json.
+    A 404 is cached like a payload and raised as NotFound, so repeat lookups
+    of a missing player don't refetch; SourceUnavailable (open circuit)
+    propagates so tools can say so.
+    """
+    key = upstream_key(url, params)
+    try:
+        data = await cache.get_or_load(key, _payload_loader(key, url, params, ttl, fetch), ttl, stale_ttl=ttl)
+    except SourceUnavailable:
+        raise
+    except UpstreamError:
+        return None
+    if isinstance(data, _NotFoundPayload):
+        raise NotFound(f"Not found: {url}")
+    return data
+
+
+async def warm_json(url: str, params: dict | None, ttl: int, horizon: float) -> bool:
+    """Keep a payload cached for at least `horizon` more seconds.
+
+    Uses the memory or disk copy when it lives long enough, otherwise fetches
+    now (sharing any in-flight load). Returns True when a request was made;
+    raises UpstreamError when that request failed.
+    """
+    key = upstream_key(url, params)
+    entry = cache.peek(key)
+    if entry is not None and entry.expires_at - time.time() > horizon:
+        return False
+    if upstream_store is not None:
+        stored = await upstream_store.aget(key)
+        if stored is not None and isinstance(stored[1], CacheEntry) and stored[0] - time.time() > horizon:
+            cache.set_entry(key, stored[1])
+            return False
+    await cache.reload(key, _payload_loader(key, url, params, ttl, use_disk=False), ttl, stale_ttl=ttl)
+    return True
+
+
 async def fetch_json_liquipedia(params: dict) -> dict | None:
     """Fetch from Liquipedia with rate limiting (1 req / 2 sec)."""
     global _liquipedia_last_call
     from config import LIQUIPEDIA_BASE, LIQUIPEDIA_MIN_INTERVAL
 
+    breaker = circuit(urlparse(LIQUIPEDIA_BASE).netloc)
+    breaker.check()
     async with _liquipedia_lock:
         now = asyncio.get_event_loop().time()
         wait = LIQUIPEDIA_MIN_INTERVAL - (now - _liquipedia_last_call)
@@ -53,10 +223,12 @@ async def fetch_json_liquipedia(params: dict) -> dict | None:
     session = await get_session()
     try:
         async with session.get(LIQUIPEDIA_BASE, params=params) as resp:
+            breaker.record(resp.status)
             if resp.status == 200:
                 return await resp.json()
             return None
     except (aiohttp.ClientError, asyncio.TimeoutError):
+        breaker.record(None)
         return None
 
 
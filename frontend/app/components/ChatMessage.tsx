@@ -169,12 +169,21 @@ export default function ChatMessage({ message, isLatest, onFollowUp }: Props) {
                 </>
               );
             })() : (
-              <div className="flex items-center gap-2 text-text-secondary text-sm">
-                <span className="gold-pulse text-gold">&#9679;</span>
-                <span className="font-[family-name:var(--font-body)] italic">
-                  {activeToolName ? t.searching(activeToolName) : t.thinking}
-                </span>
-              </div>
+              <>
+                <div className="flex items-center gap-2 text-text-secondary text-sm">
+                  <span className="gold-pulse text-gold">&#9679;</span>
+                  <span className="font-[family-name:var(--font-body)] italic">
+                    {activeToolName ? t.searching(activeToolName) : t.thinking}
+                  </span>
+                </div>
+                {message.toolPreview && (
+                  <div className="chat-markdown text-sm mt-2 opacity-70">
+                    <ReactMarkdown remarkPlugins={[remarkGfm]} components={markdownComponents}>
+                      {message.toolPreview}
+                    </ReactMarkdown>
+                  </div>
+                )}
+              </>
             )}
             {isLatest && onFollowUp && message.content && !message.activeTools && (
               <SuggestedQuestions
@@ -4,6 +4,7 @@ import { useState, useCallback, useRef, useEffect } from "react";
 import type { Message, Source, SSEChunk } from "../lib/types";
 
 const STORAGE_KEY = "aoe4bot_chat_history";
+const CONVERSATION_KEY = "aoe4bot_conversation_id";
 const MAX_STORED_MESSAGES = 50;
 
 let nextId = 0;
@@ -11,6 +12,21 @@ function genId() {
   return `msg_${Date.now()}_${nextId++}`;
 }
 
+// Lets the backend reuse tool results across turns of the same chat
+function newConversationId() {
+  const id = crypto.randomUUID();
+  try { localStorage.setItem(CONVERSATION_KEY, id); } catch {}
+  return id;
+}
+
+function loadConversationId() {
+  try {
+    const stored = localStorage.getItem(CONVERSATION_KEY);
+    if (stored) return stored;
+  } catch {}
+  return newConversationId();
+}
+
 export function useChat() {
   const [messages, setMessages] = useState<Message[]>(() => {
     if (typeof window === "undefined") return [];
@@ -18,20 +34,21 @@ export function useChat() {
       const stored = localStorage.getItem(STORAGE_KEY);
       if (stored) {
         const parsed = JSON.parse(stored);
-        return parsed.map((m: Message) => ({ ...m, activeTools: undefined }));
+        return parsed.map((m: Message) => ({ ...m, activeTools: undefined, toolPreview: undefined }));
       }
     } catch {}
     return [];
   });
   const [isLoading, setIsLoading] = useState(false);
   const abortRef = useRef<AbortController | null>(null);
+  const conversationIdRef = useRef<string | null>(null);
 
   // Persist to localStorage
   useEffect(() => {
     if (typeof window === "undefined") return;
     try {
       const toStore = messages.slice(-MAX_STORED_MESSAGES).map(
-        ({ activeTools: _, ...m }) => m
+        ({ activeTools: _, toolPreview: __, ...m }) => m
       );
       localStorage.setItem(STORAGE_KEY, JSON.stringify(toStore));
     } catch {}
@@ -52,12 +69,20 @@ export function useChat() {
 
     const controller = new AbortController();
     abortRef.current = controller;
+    conversationIdRef.current ??= loadConversationId();
 
     try {
       const res = await fetch("/api/chat", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ messages: history, stream: true }),
+        body: JSON.stringify({
+          messages: history,
+          stream: true,
+          message_events: true,
+          tool_events: true,
+          tool_output: true,
+          conversation_id: conversationIdRef.current,
+        }),
         signal: controller.signal,
       });
 
@@ -98,12 +123,12 @@ export function useChat() {
           try {
             const chunk: SSEChunk = JSON.parse(jsonStr);
 
-            if (chunk.type === "token" && chunk.content) {
+            if ((chunk.type === "token" || chunk.type === "message") && chunk.content) {
               accContent += chunk.content;
               setMessages((prev) =>
                 prev.map((m) =>
                   m.id === assistantMsg.id
-                    ? { ...m, content: accContent, activeTools: undefined }
+                    ? { ...m, content: accContent, activeTools: undefined, toolPreview: undefined }
                     : m
                 )
               );
@@ -115,6 +140,32 @@ export function useChat() {
                     : m
                 )
               );
+            } else if (chunk.type === "tool_start" && chunk.tool) {
+              setMessages((prev) =>
+                prev.map((m) =>
+                  m.id === assistantMsg.id
+                    ? { ...m, activeTools: [...(m.activeTools || []), chunk.tool!] }
+                    : m
+                )
+              );
+            } else if (chunk.type === "tool_end" && chunk.tool) {
+              // Drop one finished instance; an empty list falls back to "thinking"
+              setMessages((prev) =>
+                prev.map((m) => {
+                  if (m.id !== assistantMsg.id || !m.activeTools) return m;
+                  const i = m.activeTools.lastIndexOf(chunk.tool!);
+                  if (i < 0) return m;
+                  return { ...m, activeTools: m.activeTools.filter((_, j) => j !== i) };
+                })
+              );
+            } else if (chunk.type === "tool_output" && chunk.content && !accContent) {
+              setMessages((prev) =>
+                prev.map((m) =>
+                  m.id === assistantMsg.id
+                    ? { ...m, toolPreview: [m.toolPreview, chunk.content].filter(Boolean).join("\n\n") }
+                    : m
+                )
+              );
             } else if (chunk.type === "sources" && chunk.sources) {
               accSources = chunk.sources;
               setMessages((prev) =>
@@ -125,7 +176,7 @@ export function useChat() {
             } else if (chunk.type === "done") {
               setMessages((prev) =>
                 prev.map((m) =>
-                  m.id === assistantMsg.id ? { ...m, activeTools: undefined } : m
+                  m.id === assistantMsg.id ? { ...m, activeTools: undefined, toolPreview: undefined } : m
                 )
               );
             } else if (chunk.type === "error" && chunk.content) {
@@ -166,6 +217,7 @@ export function useChat() {
     setMessages([]);
     setIsLoading(false);
     try { localStorage.removeItem(STORAGE_KEY); } catch {}
+    conversationIdRef.current = newConversationId();
   }, []);
 
   return { messages, isLoading, sendMessage, stop, resetChat };
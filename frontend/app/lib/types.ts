@@ -4,6 +4,8 @@ export interface Message {
   content: string;
   sources?: Source[];
   activeTools?: string[];
+  // Raw table from a finished tool, shown until the answer starts streaming
+  toolPreview?: string;
 }
 
 export interface Source {
@@ -13,7 +15,17 @@ export interface Source {
 }
 
 export interface SSEChunk {
-  type: "token" | "sources" | "done" | "error" | "tool_call";
+  type:
+    | "token" | "message" | "sources" | "done" | "error" | "tool_call" | "timing"
+    | "tool_start" | "tool_end" | "tool_output";
   content?: string;
   sources?: Source[];
+  // tool_start / tool_end / tool_output
+  id?: string;
+  tool?: string;
+  duration_ms?: number;
+  cache?: string;
+  ok?: boolean;
+  cancelled?: boolean;
+  rows?: number;
 }